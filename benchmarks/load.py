@@ -0,0 +1,335 @@
+import argparse
+import asyncio
+import json
+import platform
+import socket
+import sys
+import tempfile
+import threading
+from itertools import count
+from pathlib import Path
+from time import perf_counter, sleep
+
+import httpx
+import uvicorn
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fast_zero.app import app, overload_limiters
+from fast_zero.database import build_engine, get_session
+from fast_zero.models import User, table_registry
+from fast_zero.security import (
+    create_access_token,
+    get_password_hash,
+    login_limiter,
+)
+from fast_zero.settings import Settings
+
+PASSWORD = 'benchmark-password'
+SCENARIOS = ('token', 'create_user', 'update_user')
+TRANSPORTS = ('asgi', 'socket')
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, round(fraction * (len(ordered) - 1)))
+    return ordered[index]
+
+
+async def setup_database(database_url, users):
+    engine = build_engine(Settings(DATABASE_URL=database_url))
+    async with engine.begin() as conn:
+        await conn.run_sync(table_registry.metadata.drop_all)
+        await conn.run_sync(table_registry.metadata.create_all)
+
+    # um único hash para todos: o seed não deve dominar o tempo do benchmark
+    hashed = get_password_hash(PASSWORD)
+    async with AsyncSession(engine) as session:
+        await session.execute(
+            insert(User),
+            [
+                {
+                    'username': f'bench{i}',
+                    'email': f'bench{i}@example.com',
+                    'password': hashed,
+                }
+                for i in range(users)
+            ],
+        )
+        await session.commit()
+    # as conexões abertas aqui pertencem a este loop; o app abre as suas
+    await engine.dispose()
+
+    async def get_session_override():
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = get_session_override
+    return engine
+
+
+class Scenario:
+    def __init__(self, name, users):
+        self.name = name
+        self.users = users
+        self.token_versions = dict.fromkeys(range(1, users + 1), 0)
+        self._sequence = count()
+
+    def _token(self, user_id):
+        # PUT troca a senha e revoga os tokens anteriores; o benchmark emite
+        # o próximo token localmente para medir só o PUT
+        return create_access_token({
+            'sub': f'bench{user_id - 1}@example.com',
+            'uid': user_id,
+            'ver': self.token_versions[user_id],
+        })
+
+    async def request(self, client, worker):
+        n = next(self._sequence)
+        if self.name == 'token':
+            i = n % self.users
+            return await client.post(
+                '/auth/token',
+                data={
+                    'username': f'bench{i}@example.com',
+                    'password': PASSWORD,
+                },
+            )
+        if self.name == 'create_user':
+            return await client.post(
+                '/users/',
+                json={
+                    'username': f'new{n}-{id(self)}',
+                    'email': f'new{n}-{id(self)}@example.com',
+                    'password': PASSWORD,
+                },
+            )
+
+        # cada worker atualiza sempre o mesmo usuário para não disputar versão
+        user_id = worker % self.users + 1
+        response = await client.put(
+            f'/users/{user_id}',
+            headers={'Authorization': f'Bearer {self._token(user_id)}'},
+            json={
+                'username': f'bench{user_id - 1}',
+                'email': f'bench{user_id - 1}@example.com',
+                'password': PASSWORD,
+            },
+        )
+        if response.is_success:
+            self.token_versions[user_id] += 1
+        return response
+
+
+async def drive(client, scenario, concurrency, requests):
+    latencies = []
+    errors = 0
+    remaining = count(requests, -1)
+
+    async def worker(index):
+        nonlocal errors
+        while next(remaining) > 0:
+            start = perf_counter()
+            try:
+                response = await scenario.request(client, index)
+                if response.status_code >= 400:  # noqa: PLR2004
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(perf_counter() - start)
+
+    start = perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = perf_counter() - start
+
+    return {
+        'scenario': scenario.name,
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / elapsed, 2),
+        'latency_ms': {
+            name: round(percentile(latencies, fraction) * 1000, 3)
+            for name, fraction in (
+                ('p50', 0.5),
+                ('p90', 0.9),
+                ('p99', 0.99),
+                ('max', 1.0),
+            )
+        },
+    }
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class SocketServer:
+    def __init__(self):
+        self.port = _free_port()
+        self.server = uvicorn.Server(
+            uvicorn.Config(
+                app, host='127.0.0.1', port=self.port, log_level='warning'
+            )
+        )
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            sleep(0.01)
+        return f'http://127.0.0.1:{self.port}'
+
+    def __exit__(self, *exc_info):
+        self.server.should_exit = True
+        self.thread.join()
+
+
+async def run_transport(transport, base_url, args):
+    if transport == 'asgi':
+        client_transport = httpx.ASGITransport(app=app)
+    else:
+        client_transport = httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(max_connections=max(args.concurrency))
+        )
+
+    results = []
+    async with httpx.AsyncClient(
+        transport=client_transport, base_url=base_url, timeout=60
+    ) as client:
+        for name in args.scenarios:
+            scenario = Scenario(name, args.users)
+            for concurrency in args.concurrency:
+                result = await drive(
+                    client, scenario, concurrency, args.requests
+                )
+                result['transport'] = transport
+                results.append(result)
+                print(json.dumps(result), file=sys.stderr)
+    return results
+
+
+def run(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f'sqlite+aiosqlite:///{tmp}/benchmark.db'
+        results = []
+        for transport in args.transports:
+            engine = asyncio.run(setup_database(database_url, args.users))
+            try:
+                if transport == 'asgi':
+                    results += asyncio.run(
+                        run_transport(transport, 'http://testserver', args)
+                    )
+                else:
+                    with SocketServer() as base_url:
+                        results += asyncio.run(
+                            run_transport(transport, base_url, args)
+                        )
+            finally:
+                asyncio.run(engine.dispose(close=False))
+                app.dependency_overrides.clear()
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'users': args.users,
+            'requests': args.requests,
+        },
+        'results': results,
+    }
+
+
+def _key(result):
+    return (result['scenario'], result['transport'], result['concurrency'])
+
+
+def compare(report, baseline, tolerance):
+    reference = {_key(result): result for result in baseline['results']}
+    regressions = []
+    for result in report['results']:
+        base = reference.get(_key(result))
+        if base is None:
+            continue
+        if result['throughput_rps'] < base['throughput_rps'] * (1 - tolerance):
+            regressions.append({
+                'key': _key(result),
+                'metric': 'throughput_rps',
+                'baseline': base['throughput_rps'],
+                'current': result['throughput_rps'],
+            })
+        if result['latency_ms']['p99'] > base['latency_ms']['p99'] * (
+            1 + tolerance
+        ):
+            regressions.append({
+                'key': _key(result),
+                'metric': 'latency_ms.p99',
+                'baseline': base['latency_ms']['p99'],
+                'current': result['latency_ms']['p99'],
+            })
+    return regressions
+
+
+def _csv(cast):
+    return lambda value: [cast(item) for item in value.split(',') if item]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Load benchmark for the auth and users endpoints'
+    )
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=_csv(int), default=[1, 10, 50])
+    parser.add_argument('--scenarios', type=_csv(str), default=SCENARIOS)
+    parser.add_argument('--transports', type=_csv(str), default=TRANSPORTS)
+    parser.add_argument('--output', type=Path)
+    parser.add_argument('--baseline', type=Path)
+    parser.add_argument('--save-baseline', type=Path)
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument(
+        '--keep-login-limits',
+        action='store_true',
+        help='keep login rate limiting on (off by default to measure CPU)',
+    )
+    parser.add_argument(
+        '--keep-overload-limits',
+        action='store_true',
+        help='keep the per-group concurrency limits and load shedding on',
+    )
+    args = parser.parse_args(argv)
+    login_limiter.enabled = args.keep_login_limits
+    if not args.keep_overload_limits:
+        overload_limiters.clear()
+
+    for name in args.scenarios:
+        if name not in SCENARIOS:
+            parser.error(f'unknown scenario: {name}')
+    for name in args.transports:
+        if name not in TRANSPORTS:
+            parser.error(f'unknown transport: {name}')
+    if 'update_user' in args.scenarios and args.users < max(args.concurrency):
+        parser.error('update_user needs --users >= the highest concurrency')
+
+    report = run(args)
+
+    if args.baseline and args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())
+        report['regressions'] = compare(report, baseline, args.tolerance)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(output)
+    if args.save_baseline:
+        args.save_baseline.write_text(output)
+    print(output)
+
+    return 1 if report.get('regressions') else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,81 @@
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+from time import perf_counter
+
+import httpx
+
+from benchmarks.load import percentile, setup_database
+from fast_zero.app import app
+
+PATHS = {
+    'default': {},
+    'fast': {'fast': True},
+    'fields_id': {'fields': 'id'},
+    'fields_id_fast': {'fields': 'id', 'fast': True},
+    'fields_all': {'fields': 'id,username,email,created_at,updated_at'},
+}
+
+
+async def measure(client, params, iterations):
+    latencies = []
+    for _ in range(iterations):
+        start = perf_counter()
+        response = await client.get('/users/', params=params)
+        latencies.append(perf_counter() - start)
+        response.raise_for_status()
+    return {
+        'requests_per_second': round(iterations / sum(latencies), 2),
+        'latency_ms': {
+            'p50': round(percentile(latencies, 0.5) * 1000, 3),
+            'p99': round(percentile(latencies, 0.99) * 1000, 3),
+        },
+    }
+
+
+async def run(args):
+    results = {}
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url='http://testserver'
+    ) as client:
+        for name, extra in PATHS.items():
+            params = {'limit': args.limit, **extra}
+            await measure(client, params, args.warmup)
+            results[name] = await measure(client, params, args.iterations)
+
+    baseline = results['default']['requests_per_second']
+    results['speedup'] = {
+        name: round(results[name]['requests_per_second'] / baseline, 2)
+        for name in PATHS
+        if name != 'default'
+    }
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Compare GET /users/ serialization paths and fieldsets'
+    )
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--limit', type=int, default=100)
+    parser.add_argument('--iterations', type=int, default=500)
+    parser.add_argument('--warmup', type=int, default=50)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = asyncio.run(
+            setup_database(f'sqlite+aiosqlite:///{tmp}/bench.db', args.users)
+        )
+        try:
+            results = asyncio.run(run(args))
+        finally:
+            asyncio.run(engine.dispose(close=False))
+            app.dependency_overrides.clear()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
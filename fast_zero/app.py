@@ -1,11 +1,68 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from http import HTTPStatus
+from time import perf_counter
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import PlainTextResponse
 
+from fast_zero import metrics
+from fast_zero.database import (
+    QueryTimingMiddleware,
+    dispose_engine,
+    warm_up_engine,
+)
+from fast_zero.http_cache import etag_matches, not_modified
+from fast_zero.overload import OverloadMiddleware, build_limiters
 from fast_zero.routers import auth, users
 from fast_zero.schemas import Message
+from fast_zero.security import (
+    get_password_hash_async,
+    hash_pool,
+    key_set,
+    settings,
+)
 
-app = FastAPI()
+logger = logging.getLogger('fast_zero')
+
+
+@asynccontextmanager
+async def lifespan(app):
+    start = perf_counter()
+    if settings.STARTUP_WARMUP:
+        await warm_up_engine(settings.DB_POOL_SIZE)
+        pool_ready = perf_counter()
+        # a primeira chamada paga a alocação do Argon2 e sobe o executor
+        await get_password_hash_async('warm-up')
+        logger.info(
+            'Warm-up: pool %.1f ms, argon2 %.1f ms',
+            (pool_ready - start) * 1000,
+            (perf_counter() - pool_ready) * 1000,
+        )
+    logger.info(
+        'Startup completed in %.1f ms', (perf_counter() - start) * 1000
+    )
+
+    yield
+
+    start = perf_counter()
+    await dispose_engine()
+    # shutdown(wait=True) bloqueia até os workers (threads ou processos)
+    # terminarem; fora do loop, e dentro do tempo medido
+    await asyncio.to_thread(hash_pool.shutdown)
+    logger.info(
+        'Shutdown completed in %.1f ms', (perf_counter() - start) * 1000
+    )
+
+
+overload_limiters = build_limiters(settings)
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(QueryTimingMiddleware)
+# por fora do app e por dentro das métricas, que assim contam os 503
+app.add_middleware(OverloadMiddleware, limiters=overload_limiters)
+app.add_middleware(metrics.MetricsMiddleware)
 
 app.include_router(users.router)
 app.include_router(auth.router)
@@ -14,3 +71,23 @@ app.include_router(auth.router)
 @app.get('/', response_model=Message, status_code=HTTPStatus.OK)
 def read_root():
     return {'message': 'Olá Mundo!'}
+
+
+@app.get('/metrics', response_class=PlainTextResponse, include_in_schema=False)
+def read_metrics():
+    return PlainTextResponse(
+        metrics.render(), media_type='text/plain; version=0.0.4'
+    )
+
+
+@app.get('/.well-known/jwks.json', include_in_schema=False)
+def read_jwks(request: Request):
+    cache_control = f'public, max-age={settings.JWKS_MAX_AGE}'
+    if etag_matches(request, key_set.jwks_etag):
+        return not_modified(key_set.jwks_etag, cache_control)
+
+    return Response(
+        key_set.jwks_body,
+        media_type='application/json',
+        headers={'ETag': key_set.jwks_etag, 'Cache-Control': cache_control},
+    )
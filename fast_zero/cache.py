@@ -0,0 +1,267 @@
+import json
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+
+from fast_zero.metrics import counter, gauge
+from fast_zero.singleflight import SingleFlight
+
+cache_hits = counter(
+    'fast_zero_cache_hits_total', 'Cache lookups served from cache', ('cache',)
+)
+cache_misses = counter(
+    'fast_zero_cache_misses_total', 'Cache lookups not found', ('cache',)
+)
+cache_evictions = counter(
+    'fast_zero_cache_evictions_total',
+    'Entries dropped to respect the cache size limit',
+    ('cache',),
+)
+cache_hit_ratio = gauge(
+    'fast_zero_cache_hit_ratio',
+    'Hits over lookups since the process started',
+    ('cache',),
+)
+
+
+class LRUCache:
+    def __init__(self, name, maxsize=1024, ttl=60.0):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    @property
+    def enabled(self):
+        return self.maxsize > 0 and self.ttl > 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] <= monotonic():
+                del self._data[key]
+                entry = None
+
+            if entry is None:
+                cache_misses.inc(cache=self.name)
+                return None
+
+            self._data.move_to_end(key)
+            cache_hits.inc(cache=self.name)
+            return entry[1]
+
+    def set(self, key, value):
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._data[key] = (monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                cache_evictions.inc(cache=self.name)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+def cache_stats(name):
+    hits = cache_hits.value(cache=name)
+    misses = cache_misses.value(cache=name)
+    return {
+        'hits': hits,
+        'misses': misses,
+        'evictions': cache_evictions.value(cache=name),
+        'hit_ratio': hits / (hits + misses) if hits + misses else 0.0,
+    }
+
+
+# get_many devolve só as chaves encontradas e conta hits/misses. delete e
+# clear avançam a geração do backend, e set_many só grava se ela ainda for a
+# lida antes da carga: uma invalidação durante a carga (em qualquer worker,
+# se o backend é compartilhado) descarta o valor lido antes da escrita
+class CacheBackend(ABC):
+    @abstractmethod
+    async def get_many(self, keys): ...
+
+    @abstractmethod
+    async def generation(self): ...
+
+    @abstractmethod
+    async def set_many(self, items, generation): ...
+
+    @abstractmethod
+    async def delete(self, *keys): ...
+
+    @abstractmethod
+    async def clear(self): ...
+
+
+class MemoryCacheBackend(CacheBackend):
+    def __init__(self, cache):
+        self.cache = cache
+        self._generation = 0
+
+    async def get_many(self, keys):
+        found = {}
+        for key in keys:
+            value = self.cache.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+
+    async def generation(self):
+        return self._generation
+
+    async def set_many(self, items, generation):
+        if generation != self._generation:
+            return
+        for key, value in items.items():
+            self.cache.set(key, value)
+
+    async def delete(self, *keys):
+        self._generation += 1
+        for key in keys:
+            self.cache.delete(key)
+
+    async def clear(self):
+        self._generation += 1
+        self.cache.clear()
+
+
+# cliente `redis.asyncio` (ou compatível) injetado; valores vão como JSON e
+# as evictions ficam com o servidor, fora de `cache_evictions`. A geração é
+# uma chave do próprio Redis, fora do padrão que `clear` apaga
+class RedisCacheBackend(CacheBackend):
+    def __init__(self, name, client, ttl, prefix='fast_zero'):
+        self.name = name
+        self.client = client
+        self.ttl = ttl
+        self.prefix = f'{prefix}:{name}:'
+        self.generation_key = f'{prefix}:{name}~generation'
+
+    async def get_many(self, keys):
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = await self.client.mget([self.prefix + key for key in keys])
+        found = {
+            key: json.loads(value)
+            for key, value in zip(keys, values)
+            if value is not None
+        }
+        cache_hits.inc(len(found), cache=self.name)
+        cache_misses.inc(len(keys) - len(found), cache=self.name)
+        return found
+
+    async def generation(self):
+        return await self.client.get(self.generation_key)
+
+    async def set_many(self, items, generation):
+        # WATCH na geração e todos os SET num só MULTI/EXEC: se outro worker
+        # invalidar no meio, o EXEC falha e a nova tentativa desiste
+        async def write(pipe):
+            if await pipe.get(self.generation_key) != generation:
+                return
+            pipe.multi()
+            for key, value in items.items():
+                pipe.set(
+                    self.prefix + key,
+                    json.dumps(value),
+                    px=int(self.ttl * 1000),
+                )
+
+        await self.client.transaction(write, self.generation_key)
+
+    async def delete(self, *keys):
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.incr(self.generation_key)
+            if keys:
+                pipe.delete(*(self.prefix + key for key in keys))
+            await pipe.execute()
+
+    async def clear(self):
+        keys = [key async for key in self.client.scan_iter(self.prefix + '*')]
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.incr(self.generation_key)
+            if keys:
+                pipe.delete(*keys)
+            await pipe.execute()
+
+
+class ReadThroughCache:
+    def __init__(self, name, backend):
+        self.name = name
+        self.backend = backend
+        self._flight = SingleFlight(name)
+
+    async def get_many(self, keys, loader):
+        keys = list(dict.fromkeys(keys))
+        found = await self.backend.get_many(keys)
+        missing = tuple(key for key in keys if key not in found)
+        if missing:
+            # cargas idênticas e simultâneas viram uma só: sem estouro de
+            # consultas quando uma chave popular expira
+            found.update(
+                await self._flight.do(
+                    missing, lambda: self._load(missing, loader)
+                )
+            )
+        cache_hit_ratio.set(
+            cache_stats(self.name)['hit_ratio'], cache=self.name
+        )
+        return found
+
+    async def get(self, key, loader):
+        found = await self.get_many([key], loader)
+        return found.get(key)
+
+    async def _load(self, keys, loader):
+        generation = await self.backend.generation()
+        loaded = await loader(keys)
+        if loaded:
+            await self.backend.set_many(loaded, generation)
+        return loaded
+
+    async def invalidate(self, *keys):
+        await self.backend.delete(*keys)
+
+    async def clear(self):
+        await self.backend.clear()
+
+
+def build_user_cache(settings, client=None):
+    if settings.USER_CACHE_BACKEND == 'redis':
+        if client is None:
+            # dependência opcional: o extra `redis` do pacote
+            try:
+                import redis.asyncio  # noqa: PLC0415
+            except ImportError as exc:
+                raise RuntimeError(
+                    "USER_CACHE_BACKEND=redis needs the 'redis' extra"
+                ) from exc
+
+            client = redis.asyncio.from_url(settings.USER_CACHE_REDIS_URL)
+        backend = RedisCacheBackend('user', client, settings.USER_CACHE_TTL)
+    else:
+        # 'none' mantém a interface com um LRU de tamanho zero, que nunca
+        # guarda nada
+        enabled = settings.USER_CACHE_BACKEND == 'memory'
+        backend = MemoryCacheBackend(
+            LRUCache(
+                'user',
+                maxsize=settings.USER_CACHE_SIZE if enabled else 0,
+                ttl=settings.USER_CACHE_TTL,
+            )
+        )
+    return ReadThroughCache('user', backend)
@@ -0,0 +1,75 @@
+import argparse
+import os
+from statistics import median
+from time import perf_counter
+
+from pwdlib.hashers.argon2 import Argon2Hasher
+
+MIN_MEMORY_COST = 8 * 1024
+MAX_TIME_COST = 20
+
+
+def measure(time_cost, memory_cost, parallelism, rounds=3):
+    hasher = Argon2Hasher(
+        time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism
+    )
+    samples = []
+    for _ in range(rounds):
+        start = perf_counter()
+        hasher.hash('calibration-password')
+        samples.append(perf_counter() - start)
+    return median(samples)
+
+
+def calibrate(target_seconds, parallelism, max_memory_cost, timer=measure):
+    # primeiro o maior custo de memória que cabe no alvo com time_cost=1,
+    # depois o maior time_cost que ainda cabe com essa memória
+    memory_cost = max_memory_cost
+    elapsed = timer(1, memory_cost, parallelism)
+    while elapsed > target_seconds and memory_cost > MIN_MEMORY_COST:
+        memory_cost = max(MIN_MEMORY_COST, memory_cost // 2)
+        elapsed = timer(1, memory_cost, parallelism)
+
+    time_cost = 1
+    while time_cost < MAX_TIME_COST:
+        candidate = timer(time_cost + 1, memory_cost, parallelism)
+        if candidate > target_seconds:
+            break
+        time_cost += 1
+        elapsed = candidate
+
+    return {
+        'ARGON2_TIME_COST': time_cost,
+        'ARGON2_MEMORY_COST': memory_cost,
+        'ARGON2_PARALLELISM': parallelism,
+        'measured_ms': round(elapsed * 1000, 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Propose Argon2 parameters for a target hash latency'
+    )
+    parser.add_argument('--target-ms', type=float, default=250.0)
+    parser.add_argument(
+        '--parallelism', type=int, default=min(4, os.cpu_count() or 1)
+    )
+    parser.add_argument(
+        '--max-memory-mib',
+        type=int,
+        default=64,
+        help='upper bound for memory_cost, per hash',
+    )
+    args = parser.parse_args(argv)
+
+    result = calibrate(
+        args.target_ms / 1000, args.parallelism, args.max_memory_mib * 1024
+    )
+
+    print(f'# measured {result.pop("measured_ms")} ms per hash')
+    for name, value in result.items():
+        print(f'{name}={value}')
+
+
+if __name__ == '__main__':
+    main()
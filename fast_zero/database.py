@@ -1,10 +1,214 @@
+import asyncio
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import cache
+from time import perf_counter
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.datastructures import MutableHeaders
 
+from fast_zero.metrics import counter, histogram
 from fast_zero.settings import Settings
 
-engine = create_async_engine(Settings().DATABASE_URL)
+settings = Settings()
+logger = logging.getLogger('fast_zero.sql')
+
+pool_checkout_seconds = histogram(
+    'fast_zero_db_pool_checkout_seconds',
+    'Time spent waiting for a connection from the pool',
+)
+db_queries = counter(
+    'fast_zero_db_queries_total', 'SQL statements executed', ('statement',)
+)
+
+
+db_query_seconds = histogram(
+    'fast_zero_db_query_duration_seconds',
+    'SQL statement latency',
+    ('statement',),
+)
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    seconds: float = 0.0
+
+
+# estatísticas da requisição atual; o middleware cria, os hooks acumulam
+current_queries = ContextVar('current_queries', default=None)
+
+
+@contextmanager
+def track_queries():
+    stats = QueryStats()
+    token = current_queries.set(stats)
+    try:
+        yield stats
+    finally:
+        current_queries.reset(token)
+
+
+def _statement_kind(statement):
+    return statement.lstrip().split(' ', 1)[0].upper()
+
+
+def _params_shape(parameters):
+    # só tipos, nunca valores: o log não pode vazar senhas e emails
+    if isinstance(parameters, list):
+        if not parameters:
+            return '[]'
+        return f'{len(parameters)} x {_params_shape(parameters[0])}'
+    if isinstance(parameters, dict):
+        pairs = ', '.join(
+            f'{name}: {type(value).__name__}'
+            for name, value in parameters.items()
+        )
+        return f'{{{pairs}}}'
+    return f'({", ".join(type(value).__name__ for value in parameters)})'
+
+
+@event.listens_for(Engine, 'before_cursor_execute', named=True)
+def _count_query(statement, conn, **kw):
+    db_queries.inc(statement=_statement_kind(statement))
+    stats = current_queries.get()
+    if stats is not None:
+        stats.count += 1
+    conn.info.setdefault('query_start', []).append(perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute', named=True)
+def _time_query(statement, parameters, conn, **kw):
+    elapsed = perf_counter() - conn.info['query_start'].pop()
+    db_query_seconds.observe(elapsed, statement=_statement_kind(statement))
+    stats = current_queries.get()
+    if stats is not None:
+        stats.seconds += elapsed
+
+    if elapsed * 1000 >= settings.SLOW_QUERY_MS:
+        logger.warning(
+            'Slow query (%.1f ms): %s params=%s',
+            elapsed * 1000,
+            ' '.join(statement.split()),
+            _params_shape(parameters),
+        )
+
+
+@event.listens_for(Engine, 'handle_error')
+def _discard_query_start(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get('query_start'):
+        connection.info['query_start'].pop()
+
+
+class QueryTimingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as stats:
+
+            async def send_wrapper(message):
+                # respostas em streaming só contam o que rodou até o cabeçalho
+                if message['type'] == 'http.response.start':
+                    headers = MutableHeaders(scope=message)
+                    headers.append(
+                        'Server-Timing',
+                        f'db;dur={stats.seconds * 1000:.3f};'
+                        f'desc="{stats.count} queries"',
+                    )
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+
+def _sqlite_pragmas(settings):
+    pragmas = (
+        # o SQLite só aplica FOREIGN KEY (e o ON DELETE CASCADE) se pedido
+        'PRAGMA foreign_keys=ON',
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        f'PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}',
+        f'PRAGMA cache_size={settings.SQLITE_CACHE_SIZE}',
+        f'PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT}',
+    )
+
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    return on_connect
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    # não há evento antes do checkout: a espera pela conexão (fila ou
+    # abertura de uma nova) é medida no próprio pool
+    def _do_get(self):
+        start = perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_checkout_seconds.observe(perf_counter() - start)
+
+
+def build_engine(settings):
+    url = make_url(settings.DATABASE_URL)
+    is_sqlite = url.get_backend_name() == 'sqlite'
+    options = {
+        'pool_pre_ping': settings.DB_POOL_PRE_PING,
+        'pool_recycle': settings.DB_POOL_RECYCLE,
+    }
+    # SQLite em memória usa StaticPool, que não aceita dimensionamento
+    if not is_sqlite or url.database not in {None, '', ':memory:'}:
+        options.update(
+            poolclass=TimedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+        )
+
+    engine = create_async_engine(url, **options)
+    if is_sqlite:
+        event.listen(engine.sync_engine, 'connect', _sqlite_pragmas(settings))
+
+    return engine
+
+
+# criado no primeiro uso, dentro do worker: conexões não atravessam o fork
+@cache
+def get_engine():
+    return build_engine(Settings())
+
+
+async def warm_up_engine(connections):
+    engine = get_engine()
+
+    async def ping():
+        async with engine.connect() as conn:
+            await conn.execute(text('SELECT 1'))
+
+    # checkouts simultâneos forçam o pool a abrir todas as conexões
+    await asyncio.gather(*(ping() for _ in range(connections)))
+
+
+async def dispose_engine():
+    if get_engine.cache_info().currsize:
+        await get_engine().dispose()
+        get_engine.cache_clear()
 
 
 async def get_session():
-    async with AsyncSession(engine, expire_on_commit=False) as session:
+    # sessão preguiçosa: a conexão só sai do pool na primeira query
+    async with AsyncSession(get_engine(), expire_on_commit=False) as session:
         yield session
@@ -0,0 +1,44 @@
+import csv
+import io
+import json
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fast_zero.models import User
+
+EXPORT_COLUMNS = ('id', 'username', 'email')
+MEDIA_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+
+def _ndjson_chunk(rows):
+    return ''.join(
+        json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False) + '\n'
+        for row in rows
+    )
+
+
+def _csv_chunk(rows):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+async def export_users(engine, export_format, chunk_size):
+    # o corpo é lido depois que a sessão da requisição já foi fechada:
+    # a exportação abre e fecha a sua própria
+    async with AsyncSession(engine) as session:
+        result = await session.stream(
+            select(*(getattr(User, column) for column in EXPORT_COLUMNS))
+            .order_by(User.id)
+            .execution_options(yield_per=chunk_size)
+        )
+
+        if export_format == 'csv':
+            yield _csv_chunk([EXPORT_COLUMNS])
+            encode = _csv_chunk
+        else:
+            encode = _ndjson_chunk
+
+        async for rows in result.partitions():
+            yield encode(rows)
@@ -0,0 +1,76 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from threading import Lock
+from time import perf_counter
+
+from fast_zero.metrics import counter, gauge, histogram
+
+hash_queue_depth = gauge(
+    'fast_zero_password_hash_queue_depth',
+    'Password hash jobs waiting for or running in the worker pool',
+)
+hash_seconds = histogram(
+    'fast_zero_password_hash_seconds',
+    'Password hash latency, queue wait included',
+    ('operation',),
+)
+hash_rejected = counter(
+    'fast_zero_password_hash_rejected_total',
+    'Password hash jobs rejected because the queue was full',
+)
+
+
+class HashPoolFull(Exception):
+    pass
+
+
+class HashPool:
+    def __init__(self, workers=4, queue_size=64, executor='thread'):
+        if executor not in {'thread', 'process'}:
+            raise ValueError(f'Unknown hash executor: {executor}')
+
+        self.workers = workers
+        self.max_pending = workers + queue_size
+        self.executor = executor
+        self._executor = None
+        self._pending = 0
+        self._lock = Lock()
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.executor == 'process':
+                self._executor = ProcessPoolExecutor(self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    self.workers, thread_name_prefix='password-hash'
+                )
+        return self._executor
+
+    async def run(self, operation, func, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                hash_rejected.inc()
+                raise HashPoolFull(operation)
+            self._pending += 1
+            hash_queue_depth.inc()
+
+        start = perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._get_executor(), func, *args
+            )
+        finally:
+            hash_seconds.observe(perf_counter() - start, operation=operation)
+            with self._lock:
+                self._pending -= 1
+                hash_queue_depth.dec()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
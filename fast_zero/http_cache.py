@@ -0,0 +1,33 @@
+from hashlib import blake2b
+from http import HTTPStatus
+
+from fastapi import Response
+
+
+def weak_etag(*parts):
+    digest = blake2b(
+        '|'.join(map(str, parts)).encode(), digest_size=12
+    ).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(request, etag):
+    header = request.headers.get('if-none-match')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+
+    # If-None-Match usa comparação fraca: o prefixo W/ é ignorado
+    opaque = etag.removeprefix('W/')
+    return any(
+        candidate.strip().removeprefix('W/') == opaque
+        for candidate in header.split(',')
+    )
+
+
+def not_modified(etag, cache_control):
+    return Response(
+        status_code=HTTPStatus.NOT_MODIFIED,
+        headers={'ETag': etag, 'Cache-Control': cache_control},
+    )
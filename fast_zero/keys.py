@@ -0,0 +1,110 @@
+import json
+from pathlib import Path
+
+from cryptography.hazmat.primitives.asymmetric import ec, ed448, ed25519, rsa
+from cryptography.hazmat.primitives.serialization import load_pem_private_key
+from jwt import InvalidTokenError, decode, encode, get_unverified_header
+from jwt.algorithms import get_default_algorithms
+
+from fast_zero.http_cache import weak_etag
+
+ASYMMETRIC_ALGORITHMS = {'EdDSA', 'ES256', 'ES384', 'RS256', 'PS256'}
+# tipo de chave privada que cada algoritmo aceita; conferido na carga, para
+# que uma chave errada derrube o startup e não o primeiro encode
+KEY_TYPES = {
+    'EdDSA': (ed25519.Ed25519PrivateKey, ed448.Ed448PrivateKey),
+    'ES256': ec.EllipticCurvePrivateKey,
+    'ES384': ec.EllipticCurvePrivateKey,
+    'RS256': rsa.RSAPrivateKey,
+    'PS256': rsa.RSAPrivateKey,
+}
+EC_CURVES = {'ES256': ec.SECP256R1, 'ES384': ec.SECP384R1}
+
+
+class KeySet:
+    def __init__(
+        self, algorithm, secret=None, private_keys=None, active_kid=None
+    ):
+        self.algorithm = algorithm
+        self.secret = secret
+        self.private_keys = private_keys or {}
+        # chaves públicas derivadas uma vez; decode recebe o objeto pronto
+        self.public_keys = {
+            kid: key.public_key() for kid, key in self.private_keys.items()
+        }
+
+        if self.asymmetric:
+            if not self.private_keys:
+                raise ValueError(f'{algorithm} requires JWT_KEYS_DIR keys')
+            for kid, key in self.private_keys.items():
+                self._check_key(kid, key)
+            self.active_kid = active_kid or max(self.private_keys)
+            if self.active_kid not in self.private_keys:
+                raise ValueError(f'Unknown JWT_ACTIVE_KID: {self.active_kid}')
+        else:
+            self.active_kid = None
+
+        self.jwks = self._build_jwks()
+        self.jwks_body = json.dumps(self.jwks, separators=(',', ':'))
+        self.jwks_etag = weak_etag('jwks', self.jwks_body)
+
+    @property
+    def asymmetric(self):
+        return self.algorithm in ASYMMETRIC_ALGORITHMS
+
+    def _check_key(self, kid, key):
+        curve = EC_CURVES.get(self.algorithm)
+        if not isinstance(key, KEY_TYPES[self.algorithm]) or (
+            curve and not isinstance(key.curve, curve)
+        ):
+            raise ValueError(f'JWT key {kid} is not a {self.algorithm} key')
+
+    @classmethod
+    def from_settings(cls, settings):
+        if settings.ALGORITHM not in ASYMMETRIC_ALGORITHMS:
+            return cls(settings.ALGORITHM, secret=settings.SECRET_KEY)
+
+        # sem diretório explícito, o glob pegaria qualquer .pem do cwd
+        if not settings.JWT_KEYS_DIR:
+            raise ValueError(f'{settings.ALGORITHM} requires JWT_KEYS_DIR')
+
+        private_keys = {
+            path.stem: load_pem_private_key(path.read_bytes(), password=None)
+            for path in sorted(Path(settings.JWT_KEYS_DIR).glob('*.pem'))
+        }
+        return cls(
+            settings.ALGORITHM,
+            private_keys=private_keys,
+            active_kid=settings.JWT_ACTIVE_KID,
+        )
+
+    def _build_jwks(self):
+        if not self.asymmetric:
+            return {'keys': []}
+
+        algorithm = get_default_algorithms()[self.algorithm]
+        keys = []
+        for kid, public_key in sorted(self.public_keys.items()):
+            jwk = algorithm.to_jwk(public_key, as_dict=True)
+            jwk.update({'kid': kid, 'alg': self.algorithm, 'use': 'sig'})
+            keys.append(jwk)
+        return {'keys': keys}
+
+    def encode(self, payload):
+        if not self.asymmetric:
+            return encode(payload, self.secret, algorithm=self.algorithm)
+        return encode(
+            payload,
+            self.private_keys[self.active_kid],
+            algorithm=self.algorithm,
+            headers={'kid': self.active_kid},
+        )
+
+    def decode(self, token):
+        if not self.asymmetric:
+            return decode(token, self.secret, algorithms=[self.algorithm])
+
+        key = self.public_keys.get(get_unverified_header(token).get('kid'))
+        if key is None:
+            raise InvalidTokenError('Unknown signing key')
+        return decode(token, key, algorithms=[self.algorithm])
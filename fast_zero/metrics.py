@@ -0,0 +1,209 @@
+from bisect import bisect_left
+from threading import Lock
+from time import perf_counter
+
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(
+        self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(
+                key, ([0] * (len(self.buckets) + 1), 0.0)
+            )
+            counts[bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def count(self, **labels):
+        counts, _ = self._values.get(self._key(labels), ([], 0.0))
+        return sum(counts)
+
+    def sum(self, **labels):
+        return self._values.get(self._key(labels), ([], 0.0))[1]
+
+
+REGISTRY: dict[str, Metric] = {}
+
+
+def _register(cls, name, *args, **kwargs):
+    metric = REGISTRY.get(name)
+    if metric is None:
+        metric = REGISTRY[name] = cls(name, *args, **kwargs)
+    return metric
+
+
+def counter(name, documentation, labelnames=()):
+    return _register(Counter, name, documentation, labelnames)
+
+
+def gauge(name, documentation, labelnames=()):
+    return _register(Gauge, name, documentation, labelnames)
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return _register(Histogram, name, documentation, labelnames, buckets)
+
+
+http_requests = counter(
+    'fast_zero_http_requests_total',
+    'HTTP requests by route and status code',
+    ('method', 'route', 'status'),
+)
+http_request_seconds = histogram(
+    'fast_zero_http_request_duration_seconds',
+    'HTTP request latency',
+    ('method', 'route'),
+)
+http_in_flight = gauge(
+    'fast_zero_http_requests_in_flight', 'HTTP requests being served'
+)
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    labels = ','.join(f'{name}="{_escape(value)}"' for name, value in pairs)
+    return f'{{{labels}}}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _render_metric(metric):
+    lines = [
+        f'# HELP {metric.name} {metric.documentation}',
+        f'# TYPE {metric.name} {metric.kind}',
+    ]
+    with metric._lock:
+        values = dict(metric._values)
+
+    for key, value in sorted(values.items()):
+        if not isinstance(metric, Histogram):
+            labels = _format_labels(metric.labelnames, key)
+            lines.append(f'{metric.name}{labels} {_format_value(value)}')
+            continue
+
+        counts, total = value
+        cumulative = 0
+        for bound, count in zip((*metric.buckets, float('inf')), counts):
+            cumulative += count
+            labels = _format_labels(
+                metric.labelnames, key, [('le', _format_value(bound))]
+            )
+            lines.append(f'{metric.name}_bucket{labels} {cumulative}')
+        labels = _format_labels(metric.labelnames, key)
+        lines.append(f'{metric.name}_sum{labels} {_format_value(total)}')
+        lines.append(f'{metric.name}_count{labels} {cumulative}')
+
+    return lines
+
+
+def render(registry=REGISTRY):
+    lines = []
+    for name in sorted(registry):
+        lines.extend(_render_metric(registry[name]))
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        http_in_flight.inc()
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = perf_counter() - start
+            http_in_flight.dec()
+            # usa o template da rota para não explodir a cardinalidade
+            route = getattr(scope.get('route'), 'path', 'unmatched')
+            http_request_seconds.observe(
+                elapsed, method=scope['method'], route=route
+            )
+            http_requests.inc(
+                method=scope['method'], route=route, status=status
+            )
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import func
+from sqlalchemy import DDL, ForeignKey, Index, event, func
 from sqlalchemy.orm import Mapped, mapped_column, registry
 
 table_registry = registry()
@@ -9,6 +9,7 @@ table_registry = registry()
 @table_registry.mapped_as_dataclass
 class User:
     __tablename__ = 'users'
+    __table_args__ = (Index('ix_users_created_at_id', 'created_at', 'id'),)
 
     id: Mapped[int] = mapped_column(init=False, primary_key=True)
     username: Mapped[str] = mapped_column(unique=True)
@@ -20,3 +21,89 @@ class User:
     updated_at: Mapped[datetime] = mapped_column(
         onupdate=func.now(), init=False, server_default=func.now()
     )
+    token_version: Mapped[int] = mapped_column(
+        init=False, default=0, server_default='0'
+    )
+
+
+# busca por prefixo sem diferenciar maiúsculas (ver routers/users.search_users)
+Index('ix_users_username_lower', func.lower(User.username))
+Index('ix_users_email_lower', func.lower(User.email))
+
+
+@table_registry.mapped_as_dataclass
+class RefreshToken:
+    __tablename__ = 'refresh_tokens'
+
+    jti: Mapped[str] = mapped_column(primary_key=True)
+    family: Mapped[str] = mapped_column(index=True)
+    # a remoção do usuário leva junto os refresh tokens dele
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE'), index=True
+    )
+    expires_at: Mapped[datetime]
+    used: Mapped[bool] = mapped_column(default=False)
+    revoked: Mapped[bool] = mapped_column(default=False)
+
+
+@table_registry.mapped_as_dataclass
+class TableVersion:
+    __tablename__ = 'table_versions'
+
+    name: Mapped[str] = mapped_column(primary_key=True)
+    version: Mapped[int] = mapped_column(default=0)
+
+
+# contador de alterações da tabela users mantido pelo próprio banco, usado
+# para ETags baratos; só existe no SQLite
+USERS_VERSION_DDL = (
+    "INSERT OR IGNORE INTO table_versions (name, version) VALUES ('users', 0)",
+    *(
+        f'CREATE TRIGGER IF NOT EXISTS users_version_{operation.lower()} '
+        f'AFTER {operation} ON users BEGIN '
+        'UPDATE table_versions SET version = version + 1 '
+        "WHERE name = 'users'; END"
+        for operation in ('INSERT', 'UPDATE', 'DELETE')
+    ),
+)
+
+for statement in USERS_VERSION_DDL:
+    event.listen(
+        table_registry.metadata,
+        'after_create',
+        DDL(statement).execute_if(dialect='sqlite'),
+    )
+
+
+# índice FTS5 (trigram) de username/email para busca por substring, mantido
+# em sincronia pelas triggers; só existe no SQLite
+USERS_FTS_DDL = (
+    'CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5('
+    "username, email, content='users', content_rowid='id', "
+    "tokenize='trigram')",
+    'CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users '
+    'BEGIN INSERT INTO users_fts (rowid, username, email) '
+    'VALUES (new.id, new.username, new.email); END',
+    'CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users '
+    'BEGIN INSERT INTO users_fts (users_fts, rowid, username, email) '
+    "VALUES ('delete', old.id, old.username, old.email); END",
+    'CREATE TRIGGER IF NOT EXISTS users_fts_update '
+    'AFTER UPDATE OF username, email ON users '
+    'BEGIN INSERT INTO users_fts (users_fts, rowid, username, email) '
+    "VALUES ('delete', old.id, old.username, old.email); "
+    'INSERT INTO users_fts (rowid, username, email) '
+    'VALUES (new.id, new.username, new.email); END',
+)
+
+for statement in USERS_FTS_DDL:
+    event.listen(
+        table_registry.metadata,
+        'after_create',
+        DDL(statement).execute_if(dialect='sqlite'),
+    )
+
+event.listen(
+    table_registry.metadata,
+    'before_drop',
+    DDL('DROP TABLE IF EXISTS users_fts').execute_if(dialect='sqlite'),
+)
@@ -0,0 +1,159 @@
+import asyncio
+from collections import deque
+from contextlib import suppress
+from http import HTTPStatus
+from math import ceil
+from time import perf_counter
+
+from starlette.responses import JSONResponse
+
+from fast_zero.metrics import counter, gauge, histogram
+
+EXEMPT_PATHS = frozenset({'/metrics'})
+READ_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+# POSTs que só leem, com corpo grande demais para query string
+READ_PATHS = frozenset({'/users/lookup'})
+
+overload_in_flight = gauge(
+    'fast_zero_overload_in_flight',
+    'Requests admitted and running, by route group',
+    ('group',),
+)
+overload_queue_depth = gauge(
+    'fast_zero_overload_queue_depth',
+    'Requests waiting for a slot, by route group',
+    ('group',),
+)
+overload_wait_seconds = histogram(
+    'fast_zero_overload_wait_seconds',
+    'Time queued requests waited for a slot',
+    ('group',),
+)
+overload_shed = counter(
+    'fast_zero_overload_shed_total',
+    'Requests rejected with 503 by the overload middleware',
+    ('group', 'reason'),
+)
+
+
+class Overloaded(Exception):
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class ConcurrencyLimiter:
+    def __init__(self, group, limit, queue_size, timeout):
+        self.group = group
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.active = 0
+        # futures criados no loop de quem espera, nunca no import
+        self._waiters = deque()
+
+    @property
+    def waiting(self):
+        return len(self._waiters)
+
+    async def acquire(self):
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            overload_in_flight.inc(group=self.group)
+            return
+        if len(self._waiters) >= self.queue_size:
+            raise Overloaded('queue_full')
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        overload_queue_depth.inc(group=self.group)
+        start = perf_counter()
+        try:
+            await asyncio.wait_for(waiter, self.timeout)
+        except TimeoutError:
+            # no 3.12 o prazo pode vencer na mesma volta do loop em que a vaga
+            # foi entregue; nesse caso ela já é desta requisição
+            if waiter.done() and not waiter.cancelled():
+                return
+            raise Overloaded('timeout')
+        except asyncio.CancelledError:
+            # a vaga chegou junto com o cancelamento: devolve para o próximo
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            with suppress(ValueError):
+                self._waiters.remove(waiter)
+            overload_queue_depth.dec(group=self.group)
+            overload_wait_seconds.observe(
+                perf_counter() - start, group=self.group
+            )
+
+    def release(self):
+        # passa a vaga direto para o próximo da fila, sem liberar o contador
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+        overload_in_flight.dec(group=self.group)
+
+
+def build_limiters(settings):
+    limits = {
+        'auth': settings.OVERLOAD_AUTH_CONCURRENCY,
+        'reads': settings.OVERLOAD_READ_CONCURRENCY,
+        'writes': settings.OVERLOAD_WRITE_CONCURRENCY,
+    }
+    return {
+        group: ConcurrencyLimiter(
+            group,
+            limit,
+            queue_size=settings.OVERLOAD_QUEUE_SIZE,
+            timeout=settings.OVERLOAD_QUEUE_TIMEOUT,
+        )
+        for group, limit in limits.items()
+        if limit > 0
+    }
+
+
+def route_group(scope):
+    if scope['path'].startswith('/auth/'):
+        return 'auth'
+    if scope['method'] in READ_METHODS or scope['path'] in READ_PATHS:
+        return 'reads'
+    return 'writes'
+
+
+class OverloadMiddleware:
+    def __init__(self, app, limiters):
+        self.app = app
+        self.limiters = limiters
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.limiters.get(route_group(scope))
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await limiter.acquire()
+        except Overloaded as exc:
+            overload_shed.inc(group=limiter.group, reason=exc.reason)
+            response = JSONResponse(
+                {'detail': 'Server overloaded, try again later'},
+                status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+                headers={'Retry-After': str(max(1, ceil(limiter.timeout)))},
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
@@ -0,0 +1,81 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from datetime import datetime
+
+from sqlalchemy import DateTime, and_, bindparam, or_
+from sqlalchemy.dialects import sqlite
+
+from fast_zero.models import User
+
+# server_default=func.now() grava sem microssegundos no SQLite; o bind precisa
+# do mesmo formato para a comparação de texto funcionar
+_created_at_type = DateTime().with_variant(
+    sqlite.DATETIME(
+        storage_format=(
+            '%(year)04d-%(month)02d-%(day)02d '
+            '%(hour)02d:%(minute)02d:%(second)02d'
+        )
+    ),
+    'sqlite',
+)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(order_by, user):
+    position = {'order_by': order_by, 'id': user.id}
+    if order_by == 'created_at':
+        position['created_at'] = user.created_at.isoformat()
+
+    raw = json.dumps(position, separators=(',', ':')).encode()
+    return urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+
+    try:
+        raw = urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        position = json.loads(raw)
+        position['id'] = int(position['id'])
+        if position.get('order_by') == 'created_at':
+            position['created_at'] = datetime.fromisoformat(
+                position['created_at']
+            )
+    except (BinasciiError, ValueError, TypeError, KeyError):
+        raise InvalidCursor(cursor)
+
+    return position
+
+
+def keyset_page(query, order_by, position, limit):
+    if position and position.get('order_by') != order_by:
+        raise InvalidCursor('cursor does not match order_by')
+
+    if order_by == 'created_at':
+        if position:
+            created_at = bindparam(
+                'cursor_created_at',
+                position['created_at'],
+                type_=_created_at_type,
+            )
+            query = query.where(
+                or_(
+                    User.created_at > created_at,
+                    and_(
+                        User.created_at == created_at,
+                        User.id > position['id'],
+                    ),
+                )
+            )
+        query = query.order_by(User.created_at, User.id)
+    else:
+        if position:
+            query = query.where(User.id > position['id'])
+        query = query.order_by(User.id)
+
+    return query.limit(limit + 1)
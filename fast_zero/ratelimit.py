@@ -0,0 +1,133 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from http import HTTPStatus
+from math import ceil
+from threading import Lock
+from time import monotonic
+
+from fastapi import HTTPException
+
+from fast_zero.metrics import counter, gauge
+
+login_rejected = counter(
+    'fast_zero_login_rejected_total',
+    'Login attempts rejected before password verification',
+    ('reason',),
+)
+login_verifications = gauge(
+    'fast_zero_login_verifications_in_flight',
+    'Password verifications running for /auth/token',
+)
+
+
+# take() consome um token do balde `key` e retorna 0 ou os segundos até o
+# próximo token; um backend compartilhado (ex.: Redis) só precisa disso
+class RateLimitBackend(ABC):
+    @abstractmethod
+    async def take(self, key, rate, burst): ...
+
+    @abstractmethod
+    async def clear(self): ...
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    def __init__(self, max_keys=100_000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = Lock()
+
+    async def take(self, key, rate, burst):
+        now = monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+
+        return wait
+
+    async def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class LoginLimiter:
+    def __init__(  # noqa: PLR0913, PLR0917
+        self,
+        backend,
+        ip_rate,
+        ip_burst,
+        account_rate,
+        account_burst,
+        max_concurrent_verifications,
+    ):
+        self.backend = backend
+        self.ip_rate = ip_rate
+        self.ip_burst = ip_burst
+        self.account_rate = account_rate
+        self.account_burst = account_burst
+        self.max_concurrent_verifications = max_concurrent_verifications
+        self.enabled = True
+        self._verifications = 0
+        self._lock = Lock()
+
+    @staticmethod
+    def _too_many_requests(wait):
+        return HTTPException(
+            status_code=HTTPStatus.TOO_MANY_REQUESTS,
+            detail='Too many login attempts',
+            headers={'Retry-After': str(ceil(wait))},
+        )
+
+    async def admit(self, client_ip, account):
+        if not self.enabled:
+            return
+
+        wait = await self.backend.take(
+            f'ip:{client_ip}', self.ip_rate, self.ip_burst
+        )
+        if wait:
+            login_rejected.inc(reason='ip')
+            raise self._too_many_requests(wait)
+
+        wait = await self.backend.take(
+            f'account:{account.lower()}',
+            self.account_rate,
+            self.account_burst,
+        )
+        if wait:
+            login_rejected.inc(reason='account')
+            raise self._too_many_requests(wait)
+
+    @asynccontextmanager
+    async def verification(self):
+        with self._lock:
+            if (
+                self.enabled
+                and self._verifications >= self.max_concurrent_verifications
+            ):
+                login_rejected.inc(reason='busy')
+                raise HTTPException(
+                    status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+                    detail='Server busy, try again later',
+                    headers={'Retry-After': '1'},
+                )
+            self._verifications += 1
+            login_verifications.inc()
+
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._verifications -= 1
+                login_verifications.dec()
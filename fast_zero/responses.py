@@ -0,0 +1,7 @@
+import orjson
+from fastapi.responses import JSONResponse
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content):  # noqa: PLR6301
+        return orjson.dumps(content)
@@ -1,15 +1,25 @@
+from datetime import datetime
 from http import HTTPStatus
 from typing import Annotated
+from zoneinfo import ZoneInfo
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy import select
+from sqlalchemy import delete, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from fast_zero.database import get_session
-from fast_zero.models import User
-from fast_zero.schemas import Token
-from fast_zero.security import create_access_token, verify_password
+from fast_zero.models import RefreshToken, User
+from fast_zero.schemas import RefreshRequest, Token
+from fast_zero.security import (
+    create_access_token,
+    create_refresh_token,
+    decode_refresh_token,
+    invalidate_principal,
+    login_limiter,
+    lookup_user,
+    verify_and_update_password_async,
+)
 
 router = APIRouter(prefix='/auth', tags=['auth'])
 T_Session = Annotated[AsyncSession, Depends(get_session)]
@@ -18,12 +28,14 @@ T_OAuth2Form = Annotated[OAuth2PasswordRequestForm, Depends()]
 
 @router.post('/token', response_model=Token)
 async def login_for_access_token(
+    request: Request,
     session: T_Session,
     form_data: T_OAuth2Form,
 ):
-    user = await session.scalar(
-        select(User).where(User.email == form_data.username)
-    )
+    client_ip = request.client.host if request.client else 'unknown'
+    await login_limiter.admit(client_ip, form_data.username)
+
+    user = await lookup_user(session, form_data.username)
 
     if not user:
         raise HTTPException(
@@ -31,12 +43,86 @@ async def login_for_access_token(
             detail='Incorrect email or password',
         )
 
-    if not verify_password(form_data.password, user.password):
+    async with login_limiter.verification():
+        verified, updated_hash = await verify_and_update_password_async(
+            form_data.password, user.password
+        )
+
+    if not verified:
         raise HTTPException(
             status_code=HTTPStatus.UNAUTHORIZED,
             detail='Incorrect email or password',
         )
 
-    access_token = create_access_token(data={'sub': user.email})
+    # hash gerado com parâmetros antigos do Argon2: regrava com os atuais,
+    # no mesmo commit que grava o refresh token
+    if updated_hash:
+        user.password = updated_hash
+
+    tokens = await _issue_tokens(session, user)
+
+    if updated_hash:
+        invalidate_principal(user.email)
+
+    return tokens
+
+
+async def _issue_tokens(session, user, family=None):
+    access_token = create_access_token(
+        data={'sub': user.email, 'uid': user.id, 'ver': user.token_version}
+    )
+    refresh_token, record = create_refresh_token(user, family)
+    session.add(record)
+    # cada login e refresh grava uma linha; as vencidas do usuário saem no
+    # mesmo commit, e quem não volta mais para de gerar linhas
+    await session.execute(
+        delete(RefreshToken).where(
+            RefreshToken.user_id == user.id,
+            RefreshToken.expires_at < datetime.now(tz=ZoneInfo('UTC')),
+        )
+    )
+    await session.commit()
+
+    return {
+        'access_token': access_token,
+        'token_type': 'bearer',
+        'refresh_token': refresh_token,
+    }
+
+
+@router.post('/refresh', response_model=Token)
+async def refresh_access_token(body: RefreshRequest, session: T_Session):
+    payload = decode_refresh_token(body.refresh_token)
+    invalid_token = HTTPException(
+        status_code=HTTPStatus.UNAUTHORIZED,
+        detail='Invalid refresh token',
+        headers={'WWW-Authenticate': 'Bearer'},
+    )
+
+    # marcar como usado no próprio UPDATE evita que duas requisições
+    # concorrentes rotacionem o mesmo token
+    rotated = await session.execute(
+        update(RefreshToken)
+        .where(
+            RefreshToken.jti == payload['jti'],
+            RefreshToken.used.is_(False),
+            RefreshToken.revoked.is_(False),
+        )
+        .values(used=True)
+    )
+    if rotated.rowcount != 1:
+        # token já usado: alguém tem uma cópia, então a família inteira cai
+        await session.execute(
+            update(RefreshToken)
+            .where(RefreshToken.family == payload['fam'])
+            .values(revoked=True)
+        )
+        await session.commit()
+        raise invalid_token
+
+    user = await session.scalar(select(User).where(User.id == payload['uid']))
+    if not user or user.token_version != payload.get('ver'):
+        await session.commit()
+        raise invalid_token
 
-    return {'access_token': access_token, 'token_type': 'bearer'}
+    return await _issue_tokens(session, user, family=payload['fam'])
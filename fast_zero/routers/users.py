@@ -1,72 +1,428 @@
+import asyncio
+from functools import partial
 from http import HTTPStatus
-from typing import Annotated
+from math import ceil
+from typing import Annotated, Literal
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+)
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, insert, or_, select, update
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from fast_zero.cache import build_user_cache
 from fast_zero.database import get_session
-from fast_zero.models import User
+from fast_zero.export import MEDIA_TYPES, export_users
+from fast_zero.http_cache import etag_matches, not_modified, weak_etag
+from fast_zero.models import TableVersion, User
+from fast_zero.pagination import (
+    InvalidCursor,
+    decode_cursor,
+    encode_cursor,
+    keyset_page,
+)
+from fast_zero.ratelimit import InMemoryRateLimitBackend
+from fast_zero.responses import FastJSONResponse
 from fast_zero.schemas import (
+    DEFAULT_USER_FIELDS,
     Email,
     FilterPage,  # Add this import if FilterPage is defined in schemas
     Message,
+    UserBulk,
+    UserBulkResponse,
+    UserFieldsList,
     UserList,
+    UserLookup,
+    UserLookupResponse,
     UserPublic,
     Userschema,
+    UserSearch,
+    UserUpdate,
+    user_list_model,
 )
+from fast_zero.search import search_users_query
 from fast_zero.security import (
-    get_current_user,
-    get_password_hash,
+    Identity,
+    get_current_identity,
+    get_password_hash_async,
+    hash_pool,
+    invalidate_principal,
 )
+from fast_zero.settings import Settings
 
 router = APIRouter(prefix='/users', tags=['users'])
 T_Session = Annotated[AsyncSession, Depends(get_session)]
-T_CurrentUser = Annotated[User, Depends(get_current_user)]
+T_CurrentIdentity = Annotated[Identity, Depends(get_current_identity)]
+settings = Settings()
+user_cache = build_user_cache(settings)
+# cada lote pode custar MAX_BULK_USERS hashes: o balde é por conta
+bulk_rate_limit = InMemoryRateLimitBackend()
+
+LIST_CACHE_CONTROL = 'no-cache'
+PRIVATE_CACHE_CONTROL = 'private, no-cache'
+
+
+async def _users_version(session):
+    return await session.scalar(
+        select(TableVersion.version).where(TableVersion.name == 'users')
+    )
+
+
+async def _load_public_users(engine, keys):
+    ids, emails = set(), set()
+    for key in keys:
+        kind, value = key.split(':', 1)
+        if kind == 'id':
+            ids.add(int(value))
+        else:
+            emails.add(value)
+
+    # a carga é dividida entre requisições: roda numa sessão própria, e não
+    # na de quem chegou primeiro, que pode ser cancelada no meio
+    async with AsyncSession(engine) as session:
+        rows = await session.execute(
+            select(User.id, User.username, User.email).where(
+                or_(User.id.in_(ids), User.email.in_(emails))
+            )
+        )
+    # cada linha entra no cache pelas duas chaves
+    loaded = {}
+    for row in rows.mappings():
+        loaded[f'id:{row["id"]}'] = loaded[f'email:{row["email"]}'] = dict(row)
+    return loaded
+
+
+async def _invalidate_user(user_id, *emails):
+    invalidate_principal(emails[0], user_id)
+    await user_cache.invalidate(
+        f'id:{user_id}', *(f'email:{email}' for email in emails)
+    )
+
+
+async def _update_user_columns(session, identity, values):
+    # só as colunas enviadas entram no SET; trocar senha ou email revoga os
+    # tokens emitidos, e o RETURNING dispensa o SELECT do refresh
+    if 'password' in values:
+        values['password'] = await get_password_hash_async(values['password'])
+    if {'password', 'email'} & values.keys():
+        values['token_version'] = User.token_version + 1
+
+    columns = (User.id, User.username, User.email)
+    if values:
+        query = (
+            update(User)
+            .where(User.id == identity.id)
+            .values(**values)
+            .returning(*columns)
+        )
+    else:
+        query = select(*columns).where(User.id == identity.id)
+
+    try:
+        row = (await session.execute(query)).one_or_none()
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(
+            status_code=HTTPStatus.CONFLICT,
+            detail='Username or Email already exists',
+        )
+
+    emails = (identity.email, row.email) if row else (identity.email,)
+    await _invalidate_user(identity.id, *emails)
+    if row is None:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND, detail='User not found'
+        )
+    return row
 
 
 @router.post('/', status_code=HTTPStatus.CREATED, response_model=UserPublic)
 async def create_user(user: Userschema, session: T_Session):
-    db_user = await session.scalar(
-        select(User).where(
-            (User.username == user.username) | (User.email == user.email)
+    # as constraints únicas detectam o conflito; sem SELECT prévio nem refresh
+    hashed_password = await get_password_hash_async(user.password)
+    try:
+        db_user = (
+            await session.execute(
+                insert(User)
+                .values(
+                    username=user.username,
+                    email=user.email,
+                    password=hashed_password,
+                )
+                .returning(User.id, User.username, User.email)
+            )
+        ).one()
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(
+            status_code=HTTPStatus.CONFLICT,
+            detail='Username or Email already exists',
+        )
+
+    return db_user
+
+
+async def _taken_names(session, users):
+    existing = await session.execute(
+        select(User.username, User.email).where(
+            User.username.in_({user.username for user in users})
+            | User.email.in_({user.email for user in users})
         )
     )
+    taken_usernames, taken_emails = set(), set()
+    for username, email in existing:
+        taken_usernames.add(username)
+        taken_emails.add(email)
+    return taken_usernames, taken_emails
 
-    if db_user:
-        if db_user.username == user.username:
-            raise HTTPException(
-                status_code=HTTPStatus.CONFLICT,
-                detail='Username or Email already exists',
-            )
-        elif db_user.email == user.email:
+
+async def _insert_users(session, pending):
+    ids = await session.scalars(
+        insert(User).returning(User.id, sort_by_parameter_order=True),
+        [
+            {
+                'username': user.username,
+                'email': user.email,
+                'password': hashed_password,
+            }
+            for user, _, hashed_password in pending
+        ],
+    )
+    for (_, result, _), user_id in zip(pending, ids.all()):
+        result['id'] = user_id
+    await session.commit()
+
+
+@router.post('/bulk', response_model=UserBulkResponse)
+async def create_users_bulk(
+    bulk: UserBulk, session: T_Session, current_user: T_CurrentIdentity
+):
+    wait = await bulk_rate_limit.take(
+        f'user:{current_user.id}',
+        settings.BULK_USERS_RATE,
+        settings.BULK_USERS_BURST,
+    )
+    if wait:
+        raise HTTPException(
+            status_code=HTTPStatus.TOO_MANY_REQUESTS,
+            detail='Too many bulk requests',
+            headers={'Retry-After': str(ceil(wait))},
+        )
+
+    taken_usernames, taken_emails = await _taken_names(session, bulk.users)
+    # devolve a conexão (e o snapshot de leitura) ao pool antes dos hashes,
+    # que podem levar segundos; o INSERT abre uma nova transação
+    await session.rollback()
+
+    results, accepted = [], []
+    for user in bulk.users:
+        result = {
+            'username': user.username,
+            'email': user.email,
+            'status': 'conflict',
+        }
+        if (
+            user.username not in taken_usernames
+            and user.email not in taken_emails
+        ):
+            taken_usernames.add(user.username)
+            taken_emails.add(user.email)
+            result['status'] = 'created'
+            accepted.append((user, result))
+        results.append(result)
+
+    if not accepted:
+        return {'results': results}
+
+    # limita o gather ao tamanho do pool para não estourar a fila de hash
+    slots = asyncio.Semaphore(hash_pool.workers)
+
+    async def hash_password(password):
+        async with slots:
+            return await get_password_hash_async(password)
+
+    hashed_passwords = await asyncio.gather(
+        *(hash_password(user.password) for user, _ in accepted)
+    )
+
+    pending = [
+        (user, result, hashed_password)
+        for (user, result), hashed_password in zip(accepted, hashed_passwords)
+    ]
+    while pending:
+        try:
+            await _insert_users(session, pending)
+        except IntegrityError:
+            await session.rollback()
+        else:
+            break
+
+        # outra requisição gravou algum desses nomes depois da checagem: eles
+        # viram conflict e o resto do lote é reenviado, já com os hashes
+        taken_usernames, taken_emails = await _taken_names(
+            session, [user for user, _, _ in pending]
+        )
+        remaining = []
+        for user, result, hashed_password in pending:
+            if user.username in taken_usernames or user.email in taken_emails:
+                result['status'] = 'conflict'
+            else:
+                remaining.append((user, result, hashed_password))
+        if len(remaining) == len(pending):
             raise HTTPException(
                 status_code=HTTPStatus.CONFLICT,
                 detail='Username or Email already exists',
             )
+        pending = remaining
+
+    return {'results': results}
 
-    hashed_password = get_password_hash(user.password)
-    db_user = User(
-        username=user.username, password=hashed_password, email=user.email
+
+@router.post(
+    '/lookup',
+    response_model=UserLookupResponse,
+    response_model_exclude_unset=True,
+)
+async def lookup_users(lookup: UserLookup, session: T_Session):
+    found = await user_cache.get_many(
+        [
+            *(f'id:{id_}' for id_ in lookup.ids),
+            *(f'email:{email}' for email in lookup.emails),
+        ],
+        partial(_load_public_users, session.bind),
     )
-    session.add(db_user)
-    await session.commit()
-    await session.refresh(db_user)
 
-    return db_user
+    # um resultado por item pedido, na ordem do pedido; user None é ausência
+    return {
+        'results': [
+            *(
+                {'id': id_, 'user': found.get(f'id:{id_}')}
+                for id_ in lookup.ids
+            ),
+            *(
+                {'email': email, 'user': found.get(f'email:{email}')}
+                for email in lookup.emails
+            ),
+        ]
+    }
 
 
-@router.get('/', response_model=UserList)
+@router.get(
+    '/', response_model=UserFieldsList, response_model_exclude_none=True
+)
 async def read_users(
-    session: T_Session, filter_users: Annotated[FilterPage, Query()]
+    request: Request,
+    response: Response,
+    session: T_Session,
+    filter_users: Annotated[FilterPage, Query()],
 ):
-    query = await session.scalars(
-        select(User).offset(filter_users.offset).limit(filter_users.limit)
+    cache_headers = {}
+    version = await _users_version(session)
+    if version is not None:
+        etag = weak_etag(
+            'users', version, filter_users.model_dump_json(exclude={'fast'})
+        )
+        if etag_matches(request, etag):
+            return not_modified(etag, LIST_CACHE_CONTROL)
+        cache_headers = {'ETag': etag, 'Cache-Control': LIST_CACHE_CONTROL}
+        response.headers.update(cache_headers)
+
+    # só as colunas pedidas (mais id e a coluna do cursor) saem do banco;
+    # o hash da senha nunca é lido
+    fields = filter_users.field_names
+    columns = dict.fromkeys((*fields, 'id', filter_users.order_by))
+    query = select(*(getattr(User, name) for name in columns))
+    try:
+        query = keyset_page(
+            query,
+            filter_users.order_by,
+            decode_cursor(filter_users.cursor),
+            filter_users.limit,
+        )
+    except InvalidCursor:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST, detail='Invalid cursor'
+        )
+    # sem cursor, offset escolhe a primeira página; o next_cursor dela já
+    # continua por keyset, na mesma ordem
+    if not filter_users.cursor:
+        query = query.offset(filter_users.offset)
+
+    users = (await session.execute(query)).all()
+
+    next_cursor = None
+    if len(users) > filter_users.limit:
+        users = users[: filter_users.limit]
+        next_cursor = encode_cursor(filter_users.order_by, users[-1])
+
+    if fields == DEFAULT_USER_FIELDS and not filter_users.fast:
+        return {'users': users, 'next_cursor': next_cursor}
+
+    rows = [{name: getattr(row, name) for name in fields} for row in users]
+    if filter_users.fast:
+        # o caminho rápido pula a validação do pydantic objeto a objeto
+        content = {'users': rows}
+        if next_cursor:
+            content['next_cursor'] = next_cursor
+        return FastJSONResponse(content, headers=cache_headers)
+
+    page = user_list_model(fields)(users=rows, next_cursor=next_cursor)
+    return Response(
+        page.model_dump_json(exclude_none=True),
+        media_type='application/json',
+        headers=cache_headers,
     )
-    users = query.all()
 
-    return {'users': users}
+
+@router.get(
+    '/search', response_model=UserList, response_model_exclude_none=True
+)
+async def search_users(
+    session: T_Session, search: Annotated[UserSearch, Query()]
+):
+    query = search_users_query(
+        search.q, search.mode, session.bind.dialect.name
+    )
+    try:
+        query = keyset_page(
+            query, 'id', decode_cursor(search.cursor), search.limit
+        )
+    except InvalidCursor:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST, detail='Invalid cursor'
+        )
+    users = (await session.scalars(query)).all()
+
+    next_cursor = None
+    if len(users) > search.limit:
+        users = users[: search.limit]
+        next_cursor = encode_cursor('id', users[-1])
+
+    return {'users': users, 'next_cursor': next_cursor}
+
+
+@router.get('/export', response_class=StreamingResponse)
+async def export_users_table(
+    session: T_Session,
+    export_format: Annotated[
+        Literal['ndjson', 'csv'], Query(alias='format')
+    ] = 'ndjson',
+):
+    filename = f'users.{export_format}'
+    return StreamingResponse(
+        export_users(session.bind, export_format, settings.EXPORT_CHUNK_SIZE),
+        media_type=MEDIA_TYPES[export_format],
+        headers={'Content-Disposition': f'attachment; filename={filename}'},
+    )
 
 
 @router.put('/{user_id}', response_model=UserPublic, status_code=HTTPStatus.OK)
@@ -74,49 +430,48 @@ async def update_user(
     user_id: int,
     user: Userschema,
     session: T_Session,
-    current_user: T_CurrentUser,
+    current_user: T_CurrentIdentity,
 ):
     if current_user.id != user_id:
         raise HTTPException(
             status_code=HTTPStatus.FORBIDDEN, detail='Not enough permissions'
         )
-    try:
-        current_user.email = user.email
-        current_user.username = user.username
-        current_user.password = get_password_hash(user.password)
-
-        session.add(current_user)
-        await session.commit()
-        await session.refresh(current_user)
+    return await _update_user_columns(session, current_user, user.model_dump())
 
-        return current_user
 
-    except IntegrityError:
+@router.patch('/{user_id}', response_model=UserPublic)
+async def patch_user(
+    user_id: int,
+    user: UserUpdate,
+    session: T_Session,
+    current_user: T_CurrentIdentity,
+):
+    if current_user.id != user_id:
         raise HTTPException(
-            status_code=HTTPStatus.CONFLICT,
-            detail='Username or Email already exists',
+            status_code=HTTPStatus.FORBIDDEN, detail='Not enough permissions'
         )
+    return await _update_user_columns(
+        session, current_user, user.model_dump(exclude_none=True)
+    )
 
 
 @router.delete('/{user_id}', response_model=Message)
 async def delete_user(
     user_id: int,
     session: T_Session,
-    current_user: T_CurrentUser,
+    current_user: T_CurrentIdentity,
 ):
-    # user_db = session.scalar(select(User).where(User.id == user_id))
-    # if not user_db:
-    #     raise HTTPException(
-    #         status_code=HTTPStatus.NOT_FOUND, detail='User not found'
-    #     )
     if current_user.id != user_id:
         raise HTTPException(
             status_code=HTTPStatus.FORBIDDEN, detail='Not enough permissions'
         )
-    session.delete(current_user)
+    result = await session.execute(delete(User).where(User.id == user_id))
     await session.commit()
-    # session.refresh(user_db) não pode, mesmo que na mesma sessão o objeto foi
-    # removido
+    await _invalidate_user(current_user.id, current_user.email)
+    if result.rowcount == 0:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND, detail='User not found'
+        )
 
     return {'message': 'User deleted'}
 
@@ -124,11 +479,19 @@ async def delete_user(
 @router.get('/{user_id}/email', response_model=Email)
 async def read_user_email(
     user_id: int,
-    session: T_Session,
-    current_user: T_CurrentUser,
+    request: Request,
+    response: Response,
+    current_user: T_CurrentIdentity,
 ):
     if current_user.id != user_id:
         raise HTTPException(
             status_code=HTTPStatus.FORBIDDEN, detail='Not enough permissions'
         )
+
+    etag = weak_etag('email', current_user.id, current_user.email)
+    if etag_matches(request, etag):
+        return not_modified(etag, PRIVATE_CACHE_CONTROL)
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = PRIVATE_CACHE_CONTROL
+
     return {'email': current_user.email}
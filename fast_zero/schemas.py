@@ -1,4 +1,32 @@
-from pydantic import BaseModel, ConfigDict, EmailStr
+from datetime import datetime
+from functools import cache
+from typing import Literal
+
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    EmailStr,
+    Field,
+    create_model,
+    field_validator,
+    model_validator,
+)
+
+MAX_PAGE_LIMIT = 500
+MAX_BULK_USERS = 1000
+MAX_LOOKUP_USERS = 100
+# o tokenizer trigram do FTS5 não casa nada com menos de 3 caracteres
+MIN_FULLTEXT_QUERY = 3
+
+# campos que `fields=` pode pedir; o padrão é o mesmo conjunto de UserPublic
+USER_FIELDS = {
+    'id': int,
+    'username': str,
+    'email': EmailStr,
+    'created_at': datetime,
+    'updated_at': datetime,
+}
+DEFAULT_USER_FIELDS = ('id', 'username', 'email')
 
 
 class Message(BaseModel):
@@ -11,6 +39,12 @@ class Userschema(BaseModel):
     email: EmailStr
 
 
+class UserUpdate(BaseModel):
+    username: str | None = None
+    password: str | None = None
+    email: EmailStr | None = None
+
+
 class UserPublic(BaseModel):
     id: int
     username: str
@@ -18,8 +52,80 @@ class UserPublic(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class UserBulk(BaseModel):
+    users: list[Userschema] = Field(min_length=1, max_length=MAX_BULK_USERS)
+
+
+class UserBulkResult(BaseModel):
+    username: str
+    email: EmailStr
+    status: Literal['created', 'conflict']
+    id: int | None = None
+
+
+class UserBulkResponse(BaseModel):
+    results: list[UserBulkResult]
+
+
+class UserLookup(BaseModel):
+    ids: list[int] = Field(default_factory=list)
+    emails: list[EmailStr] = Field(default_factory=list)
+
+    @model_validator(mode='after')
+    def check_size(self):
+        total = len(self.ids) + len(self.emails)
+        if not 0 < total <= MAX_LOOKUP_USERS:
+            raise ValueError(
+                f'lookup takes between 1 and {MAX_LOOKUP_USERS} ids or emails'
+            )
+        return self
+
+
+class UserLookupResult(BaseModel):
+    id: int | None = None
+    email: EmailStr | None = None
+    user: UserPublic | None
+
+
+class UserLookupResponse(BaseModel):
+    results: list[UserLookupResult]
+
+
 class UserList(BaseModel):
     users: list[UserPublic]
+    next_cursor: str | None = None
+
+
+# o que o OpenAPI documenta para GET /users/: cada item traz só os campos de
+# `fields=` (padrão id, username e email), os demais ficam de fora
+class UserFields(BaseModel):
+    id: int | None = None
+    username: str | None = None
+    email: EmailStr | None = None
+    created_at: datetime | None = None
+    updated_at: datetime | None = None
+    model_config = ConfigDict(from_attributes=True)
+
+
+class UserFieldsList(BaseModel):
+    users: list[UserFields]
+    next_cursor: str | None = None
+
+
+class UserSearch(BaseModel):
+    q: str = Field(min_length=1, max_length=100)
+    mode: Literal['prefix', 'fulltext'] = 'prefix'
+    cursor: str | None = None
+    limit: int = Field(20, ge=1, le=MAX_PAGE_LIMIT)
+
+    @model_validator(mode='after')
+    def check_fulltext_length(self):
+        if self.mode == 'fulltext' and len(self.q) < MIN_FULLTEXT_QUERY:
+            raise ValueError(
+                f'fulltext search needs at least {MIN_FULLTEXT_QUERY} '
+                'characters'
+            )
+        return self
 
 
 class Email(BaseModel):
@@ -29,8 +135,53 @@ class Email(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: str | None = None
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 
 class FilterPage(BaseModel):
-    offset: int = 0
-    limit: int = 100
+    offset: int = Field(0, ge=0)
+    limit: int = Field(100, ge=1, le=MAX_PAGE_LIMIT)
+    cursor: str | None = None
+    order_by: Literal['id', 'created_at'] = 'id'
+    fields: str | None = None
+    fast: bool = False
+
+    @field_validator('fields')
+    @classmethod
+    def normalize_fields(cls, value):
+        if value is None:
+            return None
+        names = [name.strip() for name in value.split(',')]
+        names = tuple(dict.fromkeys(name for name in names if name))
+        unknown = [name for name in names if name not in USER_FIELDS]
+        if not names or unknown:
+            raise ValueError(
+                f'fields must be a comma-separated subset of '
+                f'{", ".join(USER_FIELDS)}'
+            )
+        return ','.join(names)
+
+    @property
+    def field_names(self):
+        if not self.fields:
+            return DEFAULT_USER_FIELDS
+        return tuple(self.fields.split(','))
+
+
+@cache
+def user_list_model(fields):
+    # um schema por combinação de campos, gerado uma vez por processo
+    suffix = '_'.join(fields)
+    item = create_model(
+        f'UserFields_{suffix}',
+        **{name: (USER_FIELDS[name], ...) for name in fields},
+    )
+    return create_model(
+        f'UserList_{suffix}',
+        users=(list[item], ...),
+        next_cursor=(str | None, None),
+    )
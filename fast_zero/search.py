@@ -0,0 +1,39 @@
+from string import ascii_lowercase, ascii_uppercase
+
+from sqlalchemy import func, or_, select, text
+
+from fast_zero.models import User
+
+# maior code point: tudo que começa com o prefixo fica abaixo de prefixo+isso
+PREFIX_UPPER_BOUND = '\U0010ffff'
+# o lower() do SQLite só converte A-Z; o prefixo precisa ser dobrado igual
+ASCII_LOWER = str.maketrans(ascii_uppercase, ascii_lowercase)
+
+
+def _prefix_range(column, prefix):
+    lowered = func.lower(column)
+    return (lowered >= prefix) & (lowered < prefix + PREFIX_UPPER_BOUND)
+
+
+def search_users_query(q, mode, dialect_name):
+    if mode == 'prefix':
+        if dialect_name == 'sqlite':
+            prefix = q.translate(ASCII_LOWER)
+        else:
+            prefix = q.lower()
+        return select(User).where(
+            or_(
+                _prefix_range(User.username, prefix),
+                _prefix_range(User.email, prefix),
+            )
+        )
+
+    if dialect_name != 'sqlite':
+        return select(User).where(
+            or_(User.username.icontains(q), User.email.icontains(q))
+        )
+
+    # a consulta vira uma string FTS5 entre aspas: sem operadores do usuário
+    phrase = '"' + q.replace('"', '""') + '"'
+    matches = text('SELECT rowid FROM users_fts WHERE users_fts MATCH :q')
+    return select(User).where(User.id.in_(matches.bindparams(q=phrase)))
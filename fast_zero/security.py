@@ -1,22 +1,62 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from http import HTTPStatus
+from uuid import uuid4
 from zoneinfo import ZoneInfo
 
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
-from jwt import DecodeError, decode, encode
+from jwt import InvalidTokenError
 from pwdlib import PasswordHash
+from pwdlib.hashers.argon2 import Argon2Hasher
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
 
+from fast_zero.cache import LRUCache
 from fast_zero.database import get_session
-from fast_zero.models import User
+from fast_zero.hashing import HashPool, HashPoolFull
+from fast_zero.keys import KeySet
+from fast_zero.models import RefreshToken, User
+from fast_zero.ratelimit import InMemoryRateLimitBackend, LoginLimiter
 from fast_zero.settings import Settings
+from fast_zero.singleflight import SingleFlight
 
 settings = Settings()
+key_set = KeySet.from_settings(settings)
 
-pwd_context = PasswordHash.recommended()
+pwd_context = PasswordHash((
+    Argon2Hasher(
+        time_cost=settings.ARGON2_TIME_COST,
+        memory_cost=settings.ARGON2_MEMORY_COST,
+        parallelism=settings.ARGON2_PARALLELISM,
+    ),
+))
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl='auth/token')
+hash_pool = HashPool(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    queue_size=settings.PASSWORD_HASH_QUEUE_SIZE,
+    executor=settings.PASSWORD_HASH_EXECUTOR,
+)
+principal_cache = LRUCache(
+    'principal',
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL,
+)
+token_version_cache = LRUCache(
+    'token_version',
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.TOKEN_VERSION_CACHE_TTL,
+)
+user_lookups = SingleFlight('user_lookup')
+login_limiter = LoginLimiter(
+    InMemoryRateLimitBackend(),
+    ip_rate=settings.LOGIN_IP_RATE,
+    ip_burst=settings.LOGIN_IP_BURST,
+    account_rate=settings.LOGIN_ACCOUNT_RATE,
+    account_burst=settings.LOGIN_ACCOUNT_BURST,
+    max_concurrent_verifications=settings.LOGIN_MAX_CONCURRENT_VERIFICATIONS,
+)
 
 
 def create_access_token(data: dict):
@@ -25,12 +65,44 @@ def create_access_token(data: dict):
         minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
     )
     to_encode.update({'exp': expire})
-    encoded_jwt = encode(
-        to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
-    )
+    encoded_jwt = key_set.encode(to_encode)
     return encoded_jwt
 
 
+def create_refresh_token(user, family=None):
+    expires_at = datetime.now(tz=ZoneInfo('UTC')) + timedelta(
+        days=settings.REFRESH_TOKEN_EXPIRE_DAYS
+    )
+    record = RefreshToken(
+        jti=uuid4().hex,
+        family=family or uuid4().hex,
+        user_id=user.id,
+        expires_at=expires_at,
+    )
+    token = key_set.encode({
+        'sub': user.email,
+        'uid': user.id,
+        'ver': user.token_version,
+        'jti': record.jti,
+        'fam': record.family,
+        'typ': 'refresh',
+        'exp': expires_at,
+    })
+    return token, record
+
+
+def decode_refresh_token(token):
+    try:
+        payload = key_set.decode(token)
+    except InvalidTokenError:
+        raise _credentials_exception()
+
+    if payload.get('typ') != 'refresh' or not payload.get('jti'):
+        raise _credentials_exception()
+
+    return payload
+
+
 def get_password_hash(password):
     return pwd_context.hash(password)
 
@@ -39,33 +111,154 @@ def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 
-async def get_current_user(
-    session: AsyncSession = Depends(get_session),
-    token: str = Depends(oauth2_scheme),
-):
-    credentials_exception = HTTPException(
+def verify_and_update_password(plain_password, hashed_password):
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+async def _run_in_hash_pool(operation, func, *args):
+    try:
+        return await hash_pool.run(operation, func, *args)
+    except HashPoolFull:
+        raise HTTPException(
+            status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+            detail='Server busy, try again later',
+            headers={'Retry-After': '1'},
+        )
+
+
+async def get_password_hash_async(password):
+    return await _run_in_hash_pool('hash', get_password_hash, password)
+
+
+async def verify_password_async(plain_password, hashed_password):
+    return await _run_in_hash_pool(
+        'verify', verify_password, plain_password, hashed_password
+    )
+
+
+async def verify_and_update_password_async(plain_password, hashed_password):
+    return await _run_in_hash_pool(
+        'verify', verify_and_update_password, plain_password, hashed_password
+    )
+
+
+USER_COLUMNS = tuple(column.key for column in User.__table__.columns)
+
+
+@dataclass(frozen=True)
+class Identity:
+    id: int
+    email: str
+
+
+def _user_snapshot(user):
+    return {column: getattr(user, column) for column in USER_COLUMNS}
+
+
+async def _user_from_snapshot(session, snapshot):
+    user = User(
+        username=snapshot['username'],
+        password=snapshot['password'],
+        email=snapshot['email'],
+    )
+    for column in USER_COLUMNS:
+        setattr(user, column, snapshot[column])
+    make_transient_to_detached(user)
+
+    return await session.merge(user, load=False)
+
+
+async def lookup_user(session, email):
+    # requisições simultâneas para o mesmo email dividem um único SELECT; o
+    # que circula entre elas é o snapshot, cada sessão monta o seu User.
+    # A busca compartilhada usa sessão própria: a de quem chegou primeiro
+    # pode ser cancelada e fechada enquanto os outros ainda esperam
+    async def fetch():
+        async with AsyncSession(session.bind) as fetch_session:
+            user = await fetch_session.scalar(
+                select(User).where(User.email == email)
+            )
+            return _user_snapshot(user) if user else None
+
+    snapshot = await user_lookups.do(email, fetch)
+    if snapshot is None:
+        return None
+    return await _user_from_snapshot(session, snapshot)
+
+
+def invalidate_principal(email, user_id=None):
+    principal_cache.delete(email)
+    if user_id is not None:
+        token_version_cache.delete(user_id)
+
+
+def _credentials_exception():
+    return HTTPException(
         status_code=HTTPStatus.UNAUTHORIZED,
         detail='Could not validate credentials',
         headers={'WWW-Authenticate': 'Bearer'},
     )
 
+
+def _decode_token(token):
     try:
-        payload = decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+        payload = key_set.decode(token)
+    except InvalidTokenError:
+        raise _credentials_exception()
+
+    if not payload.get('sub') or payload.get('typ') == 'refresh':
+        raise _credentials_exception()
+
+    return payload
+
+
+async def _current_token_version(session, user_id):
+    # conferida por PK e em cache curto nos dois modos: é o que limita quanto
+    # tempo um worker que não viu a revogação ainda aceita o token antigo
+    current_version = token_version_cache.get(user_id)
+    if current_version is None:
+        current_version = await session.scalar(
+            select(User.token_version).where(User.id == user_id)
         )
-        subject_email = payload.get('sub')
+        if current_version is None:
+            raise _credentials_exception()
+        token_version_cache.set(user_id, current_version)
+    return current_version
 
-        if not subject_email:
-            raise credentials_exception
 
-    except DecodeError:
-        raise credentials_exception
+async def _load_identity(session, payload):
+    subject_email = payload['sub']
 
-    user = await session.scalar(
-        select(User).where(User.email == subject_email)
-    )
+    # o cache guarda só a identidade (id e email), nunca o hash da senha
+    identity = principal_cache.get(subject_email)
+    if identity is None:
+        user = await lookup_user(session, subject_email)
+        if not user:
+            raise _credentials_exception()
+        identity = Identity(id=user.id, email=user.email)
+        principal_cache.set(subject_email, identity)
+        token_version_cache.set(user.id, user.token_version)
+
+    # tokens emitidos antes da última troca de senha deixam de valer
+    current_version = await _current_token_version(session, identity.id)
+    if payload.get('ver', current_version) != current_version:
+        raise _credentials_exception()
+
+    return identity
+
+
+async def get_current_identity(
+    session: AsyncSession = Depends(get_session),
+    token: str = Depends(oauth2_scheme),
+):
+    payload = _decode_token(token)
+    user_id, token_version = payload.get('uid'), payload.get('ver')
+
+    if not settings.STATELESS_TOKENS or None in {user_id, token_version}:
+        return await _load_identity(session, payload)
 
-    if not user:
-        raise credentials_exception
+    # confia nas claims do token; só a versão é conferida
+    if await _current_token_version(session, user_id) != token_version:
+        raise _credentials_exception()
 
-    return user
+    return Identity(id=user_id, email=payload['sub'])
@@ -0,0 +1,59 @@
+import argparse
+import os
+from copy import deepcopy
+
+import uvicorn
+from uvicorn.config import LOGGING_CONFIG
+
+
+def log_config():
+    config = deepcopy(LOGGING_CONFIG)
+    config['loggers']['fast_zero'] = {
+        'handlers': ['default'],
+        'level': 'INFO',
+        'propagate': False,
+    }
+    return config
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Run the API with multiple uvicorn workers'
+    )
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        '--backlog',
+        type=int,
+        default=2048,
+        help='pending connections queued by the kernel per listening socket',
+    )
+    parser.add_argument(
+        '--keep-alive',
+        type=int,
+        default=75,
+        help='seconds to hold idle connections; keep above the proxy timeout',
+    )
+    parser.add_argument('--graceful-shutdown', type=int, default=30)
+    parser.add_argument('--limit-concurrency', type=int)
+    parser.add_argument('--no-access-log', action='store_true')
+    args = parser.parse_args(argv)
+
+    # cada worker importa o app do zero; engine e pool de hash nascem nele
+    uvicorn.run(
+        'fast_zero.app:app',
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        backlog=args.backlog,
+        timeout_keep_alive=args.keep_alive,
+        timeout_graceful_shutdown=args.graceful_shutdown,
+        limit_concurrency=args.limit_concurrency,
+        access_log=not args.no_access_log,
+        log_config=log_config(),
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -10,3 +10,57 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int
     SECRET_KEY: str
     ALGORITHM: str
+
+    PASSWORD_HASH_EXECUTOR: str = 'thread'
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_QUEUE_SIZE: int = 64
+
+    PRINCIPAL_CACHE_SIZE: int = 1024
+    PRINCIPAL_CACHE_TTL: float = 30.0
+
+    USER_CACHE_BACKEND: str = 'memory'
+    USER_CACHE_SIZE: int = 10_000
+    USER_CACHE_TTL: float = 60.0
+    USER_CACHE_REDIS_URL: str = 'redis://localhost:6379/0'
+
+    EXPORT_CHUNK_SIZE: int = 1000
+
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_CACHE_SIZE: int = -64 * 1024
+    SQLITE_BUSY_TIMEOUT: int = 5000
+    SLOW_QUERY_MS: float = 100.0
+
+    LOGIN_IP_RATE: float = 5.0
+    LOGIN_IP_BURST: int = 20
+    LOGIN_ACCOUNT_RATE: float = 0.2
+    LOGIN_ACCOUNT_BURST: int = 5
+    LOGIN_MAX_CONCURRENT_VERIFICATIONS: int = 8
+
+    BULK_USERS_RATE: float = 0.1
+    BULK_USERS_BURST: int = 2
+
+    OVERLOAD_AUTH_CONCURRENCY: int = 16
+    OVERLOAD_READ_CONCURRENCY: int = 128
+    OVERLOAD_WRITE_CONCURRENCY: int = 32
+    OVERLOAD_QUEUE_SIZE: int = 64
+    OVERLOAD_QUEUE_TIMEOUT: float = 2.0
+
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 64 * 1024
+    ARGON2_PARALLELISM: int = 4
+
+    STATELESS_TOKENS: bool = False
+    TOKEN_VERSION_CACHE_TTL: float = 5.0
+
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+
+    JWT_KEYS_DIR: str | None = None
+    JWT_ACTIVE_KID: str | None = None
+    JWKS_MAX_AGE: int = 3600
+
+    STARTUP_WARMUP: bool = True
@@ -0,0 +1,38 @@
+import asyncio
+
+from fast_zero.metrics import counter
+
+singleflight_calls = counter(
+    'fast_zero_singleflight_calls_total',
+    'Calls that ran their own lookup',
+    ('group',),
+)
+singleflight_coalesced = counter(
+    'fast_zero_singleflight_coalesced_total',
+    'Calls that awaited a lookup already in flight',
+    ('group',),
+)
+
+
+class SingleFlight:
+    def __init__(self, name):
+        self.name = name
+        self._tasks = {}
+
+    def __len__(self):
+        return len(self._tasks)
+
+    async def do(self, key, func):
+        # a chave inclui o loop: uma task só pode ser aguardada no seu loop
+        task_key = (asyncio.get_running_loop(), key)
+        task = self._tasks.get(task_key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._tasks[task_key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(task_key, None))
+            singleflight_calls.inc(group=self.name)
+        else:
+            singleflight_coalesced.inc(group=self.name)
+
+        # shield: cancelar um dos chamadores não derruba a busca dos outros
+        return await asyncio.shield(task)
@@ -0,0 +1,61 @@
+"""Busca de usuarios: indices em lower() e FTS5
+
+Revision ID: f6c0e9d41b57
+Revises: d25b6c8e0a93
+Create Date: 2026-10-18 15:47:19.882341
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6c0e9d41b57'
+down_revision: Union[str, Sequence[str], None] = 'd25b6c8e0a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_users_username_lower', 'users', [sa.text('lower(username)')], unique=False)
+    op.create_index('ix_users_email_lower', 'users', [sa.text('lower(email)')], unique=False)
+
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute(
+            'CREATE VIRTUAL TABLE users_fts USING fts5('
+            "username, email, content='users', content_rowid='id', "
+            "tokenize='trigram')"
+        )
+        op.execute(
+            'CREATE TRIGGER users_fts_insert AFTER INSERT ON users '
+            'BEGIN INSERT INTO users_fts (rowid, username, email) '
+            'VALUES (new.id, new.username, new.email); END'
+        )
+        op.execute(
+            'CREATE TRIGGER users_fts_delete AFTER DELETE ON users '
+            'BEGIN INSERT INTO users_fts (users_fts, rowid, username, email) '
+            "VALUES ('delete', old.id, old.username, old.email); END"
+        )
+        op.execute(
+            'CREATE TRIGGER users_fts_update '
+            'AFTER UPDATE OF username, email ON users '
+            'BEGIN INSERT INTO users_fts (users_fts, rowid, username, email) '
+            "VALUES ('delete', old.id, old.username, old.email); "
+            'INSERT INTO users_fts (rowid, username, email) '
+            'VALUES (new.id, new.username, new.email); END'
+        )
+        op.execute("INSERT INTO users_fts (users_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'sqlite':
+        for trigger in ('insert', 'delete', 'update'):
+            op.execute(f'DROP TRIGGER IF EXISTS users_fts_{trigger}')
+        op.execute('DROP TABLE IF EXISTS users_fts')
+
+    op.drop_index('ix_users_email_lower', table_name='users')
+    op.drop_index('ix_users_username_lower', table_name='users')
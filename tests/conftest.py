@@ -1,3 +1,4 @@
+import re
 from contextlib import contextmanager
 from datetime import datetime
 
@@ -11,7 +12,14 @@ from sqlalchemy.pool import StaticPool
 from fast_zero.app import app
 from fast_zero.database import get_session
 from fast_zero.models import User, table_registry
-from fast_zero.security import get_password_hash
+from fast_zero.routers.users import bulk_rate_limit, user_cache
+from fast_zero.security import (
+    get_password_hash,
+    login_limiter,
+    principal_cache,
+    settings,
+    token_version_cache,
+)
 
 # @pytest.fixture
 # def client():
@@ -38,8 +46,20 @@ from fast_zero.security import get_password_hash
 #     table_registry.metadata.drop_all(engine)
 
 
+@pytest_asyncio.fixture(autouse=True)
+async def clear_caches():
+    yield
+    principal_cache.clear()
+    token_version_cache.clear()
+    await user_cache.clear()
+    await login_limiter.backend.clear()
+    await bulk_rate_limit.clear()
+
+
 @pytest.fixture
-def client(session):
+def client(session, monkeypatch):
+    monkeypatch.setattr(settings, 'STARTUP_WARMUP', False)
+
     def get_session_override():
         return session
 
@@ -70,6 +90,47 @@ def mock_db_time():
     return _mock_db_time
 
 
+class _Statements(list):
+    # compara como a lista de tipos (SELECT, INSERT...); `sql` guarda o texto
+    # completo de cada comando, para conferir colunas e cláusulas
+    def __init__(self):
+        super().__init__()
+        self.sql = []
+
+
+@contextmanager
+def _count_queries(engine):
+    statements = _Statements()
+
+    def record_statement(conn, cursor, statement, *args):
+        statements.append(statement.lstrip().split(' ', 1)[0].upper())
+        statements.sql.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record_statement)
+
+    yield statements
+
+    event.remove(engine, 'before_cursor_execute', record_statement)
+
+
+@pytest.fixture
+def assert_query_budget():
+    # lê o Server-Timing que o QueryTimingMiddleware põe em toda resposta
+    def check(response, budget):
+        match = re.search(
+            r'db;[^,]*desc="(\d+) queries"', response.headers['Server-Timing']
+        )
+        queries = int(match.group(1))
+        assert queries <= budget, f'{queries} queries, budget is {budget}'
+
+    return check
+
+
+@pytest.fixture
+def count_queries(session):
+    return lambda: _count_queries(session.bind.sync_engine)
+
+
 @pytest_asyncio.fixture
 async def user(session):
     password = 'testtest'
@@ -96,6 +157,12 @@ def token(client, user):
     return response.json()['access_token']
 
 
+def _enable_foreign_keys(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA foreign_keys=ON')
+    cursor.close()
+
+
 @pytest_asyncio.fixture
 async def session():
     engine = create_async_engine(
@@ -103,6 +170,8 @@ async def session():
         connect_args={'check_same_thread': False},
         poolclass=StaticPool,
     )
+    # o mesmo que build_engine faz em produção: FKs valendo nos testes
+    event.listen(engine.sync_engine, 'connect', _enable_foreign_keys)
     async with engine.begin() as conn:
         await conn.run_sync(table_registry.metadata.create_all)
 
@@ -1,8 +1,28 @@
 from http import HTTPStatus
 
+from fastapi.testclient import TestClient
+
+from fast_zero.app import app
+from fast_zero.database import get_engine
+from fast_zero.security import hash_pool, settings
+
 
 def test_root_deve_retornar_ok_e_ola_mundo(client):
     response = client.get('/')
 
     assert response.status_code == HTTPStatus.OK
     assert response.json() == {'message': 'Olá Mundo!'}
+
+
+def test_lifespan_warms_up_and_disposes_engine(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', f'sqlite+aiosqlite:///{tmp_path}/a.db')
+    get_engine.cache_clear()
+
+    with TestClient(app):
+        engine = get_engine()
+        assert engine.pool.checkedin() == settings.DB_POOL_SIZE
+
+    assert get_engine.cache_info().currsize == 0
+    assert engine.pool.checkedin() == 0
+    # o aquecimento subiu o executor do hash; o shutdown o encerra
+    assert hash_pool._executor is None
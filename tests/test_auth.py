@@ -1,4 +1,20 @@
+from datetime import datetime, timedelta
 from http import HTTPStatus
+from zoneinfo import ZoneInfo
+
+import pytest
+from pwdlib import PasswordHash
+from pwdlib.hashers.argon2 import Argon2Hasher
+from sqlalchemy import select
+
+from fast_zero.models import RefreshToken, User
+from fast_zero.security import (
+    create_access_token,
+    login_limiter,
+    pwd_context,
+    settings,
+    verify_password,
+)
 
 
 def test_get_token(client, user):
@@ -11,3 +27,170 @@ def test_get_token(client, user):
     assert response.status_code == HTTPStatus.OK
     assert 'access_token' in token
     assert 'token_type' in token
+    assert 'refresh_token' in token
+
+
+def test_get_token_rate_limited_per_account(client, user, monkeypatch):
+    monkeypatch.setattr(login_limiter, 'account_burst', 1)
+    data = {'username': user.email, 'password': 'wrong'}
+
+    first = client.post('/auth/token', data=data)
+    second = client.post('/auth/token', data=data)
+
+    assert first.status_code == HTTPStatus.UNAUTHORIZED
+    assert second.status_code == HTTPStatus.TOO_MANY_REQUESTS
+    assert 'retry-after' in second.headers
+
+
+@pytest.mark.asyncio
+async def test_get_token_rehashes_outdated_password(client, session):
+    weak = PasswordHash((Argon2Hasher(time_cost=1, memory_cost=8 * 1024),))
+    user = User(
+        username='old', email='old@example.com', password=weak.hash('secret')
+    )
+    session.add(user)
+    await session.commit()
+    old_hash = user.password
+
+    response = client.post(
+        '/auth/token', data={'username': user.email, 'password': 'secret'}
+    )
+
+    await session.refresh(user)
+    assert response.status_code == HTTPStatus.OK
+    assert user.password != old_hash
+    assert not pwd_context.current_hasher.check_needs_rehash(user.password)
+    assert verify_password('secret', user.password)
+
+
+def _login(client, user):
+    return client.post(
+        '/auth/token',
+        data={'username': user.email, 'password': user.clean_password},
+    ).json()
+
+
+def test_refresh_token(client, user):
+    tokens = _login(client, user)
+
+    response = client.post(
+        '/auth/refresh', json={'refresh_token': tokens['refresh_token']}
+    )
+    refreshed = response.json()
+
+    assert response.status_code == HTTPStatus.OK
+    assert refreshed['refresh_token'] != tokens['refresh_token']
+    email = client.get(
+        f'/users/{user.id}/email',
+        headers={'Authorization': f'Bearer {refreshed["access_token"]}'},
+    )
+    assert email.status_code == HTTPStatus.OK
+
+
+def test_refresh_token_reuse_revokes_family(client, user):
+    tokens = _login(client, user)
+    rotated = client.post(
+        '/auth/refresh', json={'refresh_token': tokens['refresh_token']}
+    ).json()
+
+    reused = client.post(
+        '/auth/refresh', json={'refresh_token': tokens['refresh_token']}
+    )
+    after_reuse = client.post(
+        '/auth/refresh', json={'refresh_token': rotated['refresh_token']}
+    )
+
+    assert reused.status_code == HTTPStatus.UNAUTHORIZED
+    assert reused.json() == {'detail': 'Invalid refresh token'}
+    assert after_reuse.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_refresh_token_revoked_by_password_change(client, user):
+    tokens = _login(client, user)
+    client.put(
+        f'/users/{user.id}',
+        headers={'Authorization': f'Bearer {tokens["access_token"]}'},
+        json={
+            'username': user.username,
+            'email': user.email,
+            'password': 'anotherpassword',
+        },
+    )
+
+    response = client.post(
+        '/auth/refresh', json={'refresh_token': tokens['refresh_token']}
+    )
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_delete_user_removes_refresh_tokens(client, user):
+    tokens = _login(client, user)
+
+    deleted = client.delete(
+        f'/users/{user.id}',
+        headers={'Authorization': f'Bearer {tokens["access_token"]}'},
+    )
+    response = client.post(
+        '/auth/refresh', json={'refresh_token': tokens['refresh_token']}
+    )
+
+    # com as FKs ligadas, o DELETE só passa porque os tokens vão em cascata
+    assert deleted.status_code == HTTPStatus.OK
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_access_token_is_not_a_refresh_token(client, token):
+    response = client.post('/auth/refresh', json={'refresh_token': token})
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_refresh_token_is_not_an_access_token(client, user):
+    tokens = _login(client, user)
+
+    response = client.get(
+        f'/users/{user.id}/email',
+        headers={'Authorization': f'Bearer {tokens["refresh_token"]}'},
+    )
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_expired_access_token(client, user, monkeypatch):
+    monkeypatch.setattr(settings, 'ACCESS_TOKEN_EXPIRE_MINUTES', -1)
+    token = create_access_token({'sub': user.email})
+
+    response = client.get(
+        f'/users/{user.id}/email',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+@pytest.mark.asyncio
+async def test_login_prunes_expired_refresh_tokens(client, session, user):
+    now = datetime.now(tz=ZoneInfo('UTC'))
+    session.add_all([
+        RefreshToken(
+            jti='expired',
+            family='old',
+            user_id=user.id,
+            expires_at=now - timedelta(days=1),
+        ),
+        RefreshToken(
+            jti='valid',
+            family='current',
+            user_id=user.id,
+            expires_at=now + timedelta(days=1),
+        ),
+    ])
+    await session.commit()
+
+    _login(client, user)
+
+    jtis = set(await session.scalars(select(RefreshToken.jti)))
+    assert 'expired' not in jtis
+    assert 'valid' in jtis
+    assert len(jtis) == 2  # noqa: PLR2004
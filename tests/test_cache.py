@@ -0,0 +1,259 @@
+import asyncio
+from fnmatch import fnmatch
+
+import pytest
+
+from fast_zero.cache import (
+    CacheBackend,
+    LRUCache,
+    MemoryCacheBackend,
+    ReadThroughCache,
+    build_user_cache,
+    cache_evictions,
+    cache_hits,
+    cache_stats,
+)
+from fast_zero.settings import Settings
+
+
+def test_lru_cache_get_and_set():
+    cache = LRUCache('test-get')
+
+    cache.set('a', 1)
+
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    assert cache_hits.value(cache='test-get') == 1
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache('test-lru', maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert len(cache) == 2  # noqa: PLR2004
+    assert cache_evictions.value(cache='test-lru') == 1
+
+
+def test_lru_cache_expires_entries(monkeypatch):
+    cache = LRUCache('test-ttl', ttl=10)
+    cache.set('a', 1)
+
+    monkeypatch.setattr('fast_zero.cache.monotonic', lambda: float('inf'))
+
+    assert cache.get('a') is None
+
+
+def test_lru_cache_disabled_when_ttl_is_zero():
+    cache = LRUCache('test-disabled', ttl=0)
+
+    cache.set('a', 1)
+
+    assert cache.get('a') is None
+
+
+def test_lru_cache_delete():
+    cache = LRUCache('test-delete')
+    cache.set('a', 1)
+
+    cache.delete('a')
+
+    assert cache.get('a') is None
+
+
+class StandInPipeline:
+    # comandos ficam na fila até execute(); get é imediato, como após WATCH
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.commands.clear()
+
+    async def get(self, key):
+        return self.redis.data.get(key)
+
+    def multi(self):
+        self.commands.clear()
+
+    def set(self, key, value, px=None):
+        self.commands.append(lambda: self.redis.set_now(key, value))
+
+    def incr(self, key):
+        self.commands.append(lambda: self.redis.incr_now(key))
+
+    def delete(self, *keys):
+        self.commands.append(lambda: self.redis.delete_now(*keys))
+
+    async def execute(self):
+        self.redis.round_trips += 1
+        for command in self.commands:
+            command()
+        self.commands.clear()
+
+
+class StandInRedis:
+    # só o subconjunto de comandos que o RedisCacheBackend usa; TTL ignorado
+    # e sem conflito de WATCH (a troca de geração no meio é testada à parte)
+    def __init__(self):
+        self.data = {}
+        self.round_trips = 0
+
+    def set_now(self, key, value):
+        self.data[key] = value.encode()
+
+    def incr_now(self, key):
+        self.data[key] = str(int(self.data.get(key, b'0')) + 1).encode()
+
+    def delete_now(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def pipeline(self, transaction=True):
+        return StandInPipeline(self)
+
+    async def transaction(self, func, *watches):
+        async with self.pipeline() as pipe:
+            await func(pipe)
+            await pipe.execute()
+
+    async def scan_iter(self, match):
+        for key in list(self.data):
+            if fnmatch(key, match):
+                yield key
+
+
+def _data_keys(client):
+    return [key for key in client.data if not key.endswith('~generation')]
+
+
+def _memory_cache(name):
+    return ReadThroughCache(name, MemoryCacheBackend(LRUCache(name)))
+
+
+@pytest.mark.asyncio
+async def test_read_through_cache_loads_only_missing_keys():
+    cache = _memory_cache('test-read-through')
+    loaded = []
+
+    async def loader(keys):
+        loaded.append(keys)
+        return {key: key.upper() for key in keys if key != 'absent'}
+
+    await cache.get_many(['a'], loader)
+    found = await cache.get_many(['a', 'b', 'absent'], loader)
+
+    assert found == {'a': 'A', 'b': 'B'}
+    assert loaded == [('a',), ('b', 'absent')]
+    assert cache_stats('test-read-through') == {
+        'hits': 1,
+        'misses': 3,
+        'evictions': 0,
+        'hit_ratio': 0.25,
+    }
+
+
+@pytest.mark.asyncio
+async def test_read_through_cache_coalesces_concurrent_loads():
+    cache = _memory_cache('test-stampede')
+    release = asyncio.Event()
+    calls = 0
+
+    async def loader(keys):
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return {key: 1 for key in keys}
+
+    lookups = [asyncio.create_task(cache.get('k', loader)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*lookups) == [1] * 5
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_invalidation_during_load_skips_stale_write():
+    cache = _memory_cache('test-stale')
+
+    async def loader(keys):
+        await cache.invalidate('k')
+        return {'k': 'stale'}
+
+    assert await cache.get('k', loader) == 'stale'
+    assert await cache.backend.get_many(['k']) == {}
+
+
+@pytest.mark.asyncio
+async def test_redis_backend_against_stand_in():
+    client = StandInRedis()
+    settings = Settings(USER_CACHE_BACKEND='redis')
+    cache = build_user_cache(settings, client=client)
+
+    async def loader(keys):
+        return {key: {'id': 1} for key in keys}
+
+    assert await cache.get('id:1', loader) == {'id': 1}
+    assert _data_keys(client) == ['fast_zero:user:id:1']
+    assert await cache.get('id:1', loader) == {'id': 1}
+
+    await cache.invalidate('id:1')
+    assert _data_keys(client) == []
+
+    await cache.get('id:1', loader)
+    await cache.clear()
+    assert _data_keys(client) == []
+
+
+@pytest.mark.asyncio
+async def test_redis_backend_writes_a_batch_in_one_round_trip():
+    client = StandInRedis()
+    cache = build_user_cache(Settings(USER_CACHE_BACKEND='redis'), client)
+
+    async def loader(keys):
+        return {key: {'id': 1} for key in keys}
+
+    await cache.get_many([f'id:{i}' for i in range(10)], loader)
+
+    assert len(_data_keys(client)) == 10  # noqa: PLR2004
+    assert client.round_trips == 1
+
+
+@pytest.mark.asyncio
+async def test_invalidation_from_another_worker_skips_stale_write():
+    client = StandInRedis()
+    settings = Settings(USER_CACHE_BACKEND='redis')
+    worker_a = build_user_cache(settings, client=client)
+    worker_b = build_user_cache(settings, client=client)
+
+    async def loader(keys):
+        # a escrita acontece em outro worker enquanto este ainda carrega
+        await worker_b.invalidate('k')
+        return {'k': 'stale'}
+
+    assert await worker_a.get('k', loader) == 'stale'
+    assert await worker_a.backend.get_many(['k']) == {}
+
+
+def test_cache_backend_requires_every_operation():
+    class GetOnlyBackend(CacheBackend):
+        async def get_many(self, keys):  # noqa: PLR6301
+            return {}
+
+    with pytest.raises(TypeError):
+        GetOnlyBackend()
@@ -0,0 +1,24 @@
+from fast_zero.calibrate import MIN_MEMORY_COST, calibrate, measure
+
+
+def fake_timer(time_cost, memory_cost, parallelism):
+    return time_cost * memory_cost / (parallelism * 1_000_000)
+
+
+def test_calibrate_reduces_memory_then_raises_time_cost():
+    result = calibrate(0.05, 1, 256 * 1024, timer=fake_timer)
+
+    assert result['ARGON2_MEMORY_COST'] == 32 * 1024
+    assert result['ARGON2_TIME_COST'] == 1
+    assert result['measured_ms'] <= 50  # noqa: PLR2004
+
+
+def test_calibrate_uses_time_cost_when_memory_fits():
+    result = calibrate(0.05, 1, 8 * 1024, timer=fake_timer)
+
+    assert result['ARGON2_MEMORY_COST'] == MIN_MEMORY_COST
+    assert result['ARGON2_TIME_COST'] == 6  # noqa: PLR2004
+
+
+def test_measure_returns_positive_latency():
+    assert measure(1, MIN_MEMORY_COST, 1, rounds=1) > 0
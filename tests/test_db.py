@@ -1,9 +1,15 @@
+import asyncio
+import logging
+import re
 from dataclasses import asdict
 
 import pytest
-from sqlalchemy import select
+from sqlalchemy import select, text
 
+from fast_zero import database
+from fast_zero.database import build_engine, get_session, pool_checkout_seconds
 from fast_zero.models import User
+from fast_zero.settings import Settings
 
 
 @pytest.mark.asyncio
@@ -24,4 +30,130 @@ async def test_create_user(session, mock_db_time):
         'email': 'teste@test',
         'created_at': time,
         'updated_at': time,
+        'token_version': 0,
     }
+
+
+@pytest.mark.asyncio
+async def test_build_engine_applies_sqlite_pragmas(tmp_path):
+    settings = Settings(DATABASE_URL=f'sqlite+aiosqlite:///{tmp_path}/db.db')
+    engine = build_engine(settings)
+
+    async with engine.connect() as conn:
+        journal_mode = await conn.scalar(text('PRAGMA journal_mode'))
+        synchronous = await conn.scalar(text('PRAGMA synchronous'))
+        busy_timeout = await conn.scalar(text('PRAGMA busy_timeout'))
+        foreign_keys = await conn.scalar(text('PRAGMA foreign_keys'))
+
+    await engine.dispose()
+
+    assert journal_mode == 'wal'
+    assert synchronous == 1  # NORMAL
+    assert busy_timeout == settings.SQLITE_BUSY_TIMEOUT
+    assert foreign_keys == 1
+    assert engine.pool.size() == settings.DB_POOL_SIZE
+
+
+@pytest.mark.asyncio
+async def test_get_session_checks_out_on_first_query(tmp_path, monkeypatch):
+    engine = build_engine(
+        Settings(DATABASE_URL=f'sqlite+aiosqlite:///{tmp_path}/db.db')
+    )
+    monkeypatch.setattr(database, 'get_engine', lambda: engine)
+    before = pool_checkout_seconds.count()
+
+    async for session in get_session():
+        assert pool_checkout_seconds.count() == before
+        assert await session.scalar(text('SELECT 1')) == 1
+
+    await engine.dispose()
+
+    assert pool_checkout_seconds.count() == before + 1
+
+
+@pytest.mark.asyncio
+async def test_pool_checkout_measures_wait(tmp_path):
+    engine = build_engine(
+        Settings(
+            DATABASE_URL=f'sqlite+aiosqlite:///{tmp_path}/db.db',
+            DB_POOL_SIZE=1,
+            DB_MAX_OVERFLOW=0,
+        )
+    )
+    held = await engine.connect()
+    before = pool_checkout_seconds.sum()
+
+    async def query():
+        async with engine.connect() as conn:
+            return await conn.scalar(text('SELECT 1'))
+
+    waiting = asyncio.create_task(query())
+    await asyncio.sleep(0.05)
+    await held.close()
+
+    assert await waiting == 1
+    await engine.dispose()
+
+    assert pool_checkout_seconds.sum() - before >= 0.05  # noqa: PLR2004
+
+
+def test_server_timing_header(client):
+    response = client.get('/users/')
+
+    assert re.fullmatch(
+        r'db;dur=\d+\.\d{3};desc="2 queries"',
+        response.headers['Server-Timing'],
+    )
+
+
+@pytest.mark.parametrize(
+    ('method', 'path', 'body', 'budget'),
+    [
+        ('get', '/users/', None, 2),
+        ('get', '/users/search?q=te', None, 1),
+        ('post', '/users/', {'username': 'a', 'email': 'a@a.com'}, 1),
+        ('get', '/users/{id}/email', None, 1),
+        ('patch', '/users/{id}', {'username': 'renamed'}, 2),
+        ('put', '/users/{id}', {'username': 'b', 'email': 'b@b.com'}, 2),
+        ('delete', '/users/{id}', None, 2),
+    ],
+)
+def test_users_query_budget(  # noqa: PLR0913, PLR0917
+    client, user, token, assert_query_budget, method, path, body, budget
+):
+    kwargs = {'headers': {'Authorization': f'Bearer {token}'}}
+    if body is not None:
+        kwargs['json'] = {'password': 'secret', **body}
+
+    response = client.request(method, path.format(id=user.id), **kwargs)
+
+    assert response.is_success
+    assert_query_budget(response, budget)
+
+
+def test_auth_query_budget(client, user, assert_query_budget):
+    response = client.post(
+        '/auth/token',
+        data={'username': user.email, 'password': user.clean_password},
+    )
+    # o DELETE dos refresh tokens vencidos entra nos dois orçamentos
+    assert_query_budget(response, 3)
+
+    response = client.post(
+        '/auth/refresh',
+        json={'refresh_token': response.json()['refresh_token']},
+    )
+    assert_query_budget(response, 4)
+
+
+def test_slow_query_log_records_parameter_shape(
+    client, user, caplog, monkeypatch
+):
+    monkeypatch.setattr(database.settings, 'SLOW_QUERY_MS', 0)
+
+    with caplog.at_level(logging.WARNING, logger='fast_zero.sql'):
+        client.get('/users/search?q=teste')
+
+    [record] = [r for r in caplog.records if 'FROM users' in r.message]
+    assert 'params=(str, str' in record.message
+    assert 'teste' not in record.message
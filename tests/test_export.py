@@ -0,0 +1,81 @@
+import json
+import tracemalloc
+from http import HTTPStatus
+
+import pytest
+from sqlalchemy import insert
+
+from fast_zero.export import export_users
+from fast_zero.models import User
+
+
+async def _seed_users(session, start, stop):
+    await session.execute(
+        insert(User),
+        [
+            {
+                'username': f'user{i}',
+                'email': f'user{i}@example.com',
+                'password': 'hash',
+            }
+            for i in range(start, stop)
+        ],
+    )
+    await session.commit()
+
+
+async def _export_peak_memory(session):
+    rows = 0
+    tracemalloc.start()
+    async for chunk in export_users(session.bind, 'ndjson', 500):
+        rows += chunk.count('\n')
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return rows, peak
+
+
+def test_export_users_ndjson(client, user):
+    response = client.get('/users/export')
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    assert [json.loads(line) for line in response.text.splitlines()] == [
+        {'id': user.id, 'username': user.username, 'email': user.email}
+    ]
+
+
+def test_export_users_csv(client, user):
+    response = client.get('/users/export', params={'format': 'csv'})
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'].startswith('text/csv')
+    assert response.text.splitlines() == [
+        'id,username,email',
+        f'{user.id},{user.username},{user.email}',
+    ]
+
+
+@pytest.mark.asyncio
+async def test_export_users_outlives_request_session(session, user):
+    engine = session.bind
+    await session.close()
+
+    chunks = [chunk async for chunk in export_users(engine, 'csv', 500)]
+
+    assert ''.join(chunks).splitlines() == [
+        'id,username,email',
+        f'{user.id},{user.username},{user.email}',
+    ]
+
+
+@pytest.mark.asyncio
+async def test_export_users_memory_does_not_grow_with_table(session):
+    await _seed_users(session, 0, 2_000)
+    small_rows, small_peak = await _export_peak_memory(session)
+
+    await _seed_users(session, 2_000, 40_000)
+    large_rows, large_peak = await _export_peak_memory(session)
+
+    assert small_rows == 2_000  # noqa: PLR2004
+    assert large_rows == 40_000  # noqa: PLR2004
+    assert large_peak < small_peak * 2
@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from fast_zero.hashing import HashPool, HashPoolFull, hash_seconds
+from fast_zero.security import (
+    get_password_hash_async,
+    verify_password,
+    verify_password_async,
+)
+
+
+@pytest.mark.asyncio
+async def test_hash_and_verify_async():
+    hashed = await get_password_hash_async('secret')
+
+    assert verify_password('secret', hashed)
+    assert await verify_password_async('secret', hashed)
+    assert not await verify_password_async('wrong', hashed)
+
+
+@pytest.mark.asyncio
+async def test_hash_pool_records_latency():
+    pool = HashPool(workers=1, queue_size=0)
+    before = hash_seconds.count(operation='test')
+
+    result = await pool.run('test', sum, [1, 2])
+
+    assert result == 3  # noqa: PLR2004
+    assert hash_seconds.count(operation='test') == before + 1
+    assert pool.pending == 0
+    pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_hash_pool_rejects_when_queue_is_full():
+    pool = HashPool(workers=1, queue_size=0)
+    started = asyncio.Event()
+    release = asyncio.Event()
+    loop = asyncio.get_running_loop()
+
+    def blocking():
+        loop.call_soon_threadsafe(started.set)
+        asyncio.run_coroutine_threadsafe(release.wait(), loop).result()
+
+    job = asyncio.create_task(pool.run('test', blocking))
+    await started.wait()
+
+    with pytest.raises(HashPoolFull):
+        await pool.run('test', sum, [1])
+
+    release.set()
+    await job
+    pool.shutdown()
+
+
+def test_hash_pool_rejects_unknown_executor():
+    with pytest.raises(ValueError, match='Unknown hash executor'):
+        HashPool(executor='gpu')
@@ -0,0 +1,25 @@
+from starlette.requests import Request
+
+from fast_zero.http_cache import etag_matches, weak_etag
+
+
+def _request(if_none_match=None):
+    headers = []
+    if if_none_match is not None:
+        headers.append((b'if-none-match', if_none_match.encode()))
+    return Request({'type': 'http', 'headers': headers})
+
+
+def test_weak_etag_is_stable():
+    assert weak_etag('users', 1) == weak_etag('users', 1)
+    assert weak_etag('users', 1) != weak_etag('users', 2)
+
+
+def test_etag_matches_weak_comparison():
+    etag = weak_etag('users', 1)
+    opaque = etag.removeprefix('W/')
+
+    assert etag_matches(_request(f'"other", {opaque}'), etag)
+    assert etag_matches(_request('*'), etag)
+    assert not etag_matches(_request('"other"'), etag)
+    assert not etag_matches(_request(), etag)
@@ -0,0 +1,122 @@
+from http import HTTPStatus
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from jwt import InvalidTokenError, PyJWK, decode
+
+from fast_zero.keys import KeySet
+from fast_zero.settings import Settings
+
+
+def _write_key(directory, kid, key):
+    (directory / f'{kid}.pem').write_bytes(
+        key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+    )
+
+
+@pytest.fixture
+def keys_dir(tmp_path):
+    _write_key(tmp_path, '2026-01', ed25519.Ed25519PrivateKey.generate())
+    _write_key(tmp_path, '2026-02', ed25519.Ed25519PrivateKey.generate())
+    return tmp_path
+
+
+def _key_set(keys_dir, algorithm='EdDSA', active_kid=None):
+    return KeySet.from_settings(
+        Settings(
+            ALGORITHM=algorithm,
+            JWT_KEYS_DIR=str(keys_dir),
+            JWT_ACTIVE_KID=active_kid,
+        )
+    )
+
+
+def test_key_set_signs_with_latest_kid(keys_dir):
+    key_set = _key_set(keys_dir)
+
+    token = key_set.encode({'sub': 'a@example.com'})
+
+    assert key_set.active_kid == '2026-02'
+    assert key_set.decode(token) == {'sub': 'a@example.com'}
+
+
+def test_key_set_verifies_tokens_from_rotated_keys(keys_dir):
+    old = _key_set(keys_dir, active_kid='2026-01')
+    token = old.encode({'sub': 'a@example.com'})
+
+    assert _key_set(keys_dir).decode(token)['sub'] == 'a@example.com'
+
+
+def test_key_set_rejects_unknown_kid(keys_dir, tmp_path_factory):
+    other_dir = tmp_path_factory.mktemp('other')
+    _write_key(other_dir, 'other', ed25519.Ed25519PrivateKey.generate())
+    token = _key_set(other_dir).encode({'sub': 'a@example.com'})
+
+    with pytest.raises(InvalidTokenError):
+        _key_set(keys_dir).decode(token)
+
+
+def test_jwks_verifies_tokens(keys_dir):
+    key_set = _key_set(keys_dir)
+    token = key_set.encode({'sub': 'a@example.com'})
+
+    jwk = next(jwk for jwk in key_set.jwks['keys'] if jwk['kid'] == '2026-02')
+
+    assert len(key_set.jwks['keys']) == 2  # noqa: PLR2004
+    assert 'd' not in jwk
+    payload = decode(token, PyJWK(jwk).key, algorithms=['EdDSA'])
+    assert payload['sub'] == 'a@example.com'
+
+
+def test_key_set_es256(tmp_path):
+    _write_key(tmp_path, 'ec', ec.generate_private_key(ec.SECP256R1()))
+    key_set = _key_set(tmp_path, algorithm='ES256')
+
+    token = key_set.encode({'sub': 'a@example.com'})
+
+    assert key_set.decode(token)['sub'] == 'a@example.com'
+    assert key_set.jwks['keys'][0]['crv'] == 'P-256'
+
+
+def test_key_set_requires_keys_for_asymmetric(tmp_path):
+    with pytest.raises(ValueError, match='requires JWT_KEYS_DIR'):
+        _key_set(tmp_path)
+
+
+def test_jwks_endpoint(client):
+    response = client.get('/.well-known/jwks.json')
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {'keys': []}
+    assert response.headers['cache-control'].startswith('public, max-age=')
+
+    cached = client.get(
+        '/.well-known/jwks.json',
+        headers={'If-None-Match': response.headers['etag']},
+    )
+    assert cached.status_code == HTTPStatus.NOT_MODIFIED
+
+
+def test_key_set_requires_keys_dir():
+    with pytest.raises(ValueError, match='requires JWT_KEYS_DIR'):
+        KeySet.from_settings(Settings(ALGORITHM='EdDSA', JWT_KEYS_DIR=None))
+
+
+@pytest.mark.parametrize(
+    ('algorithm', 'key'),
+    [
+        ('ES256', ed25519.Ed25519PrivateKey.generate()),
+        ('ES256', ec.generate_private_key(ec.SECP384R1())),
+        ('EdDSA', ec.generate_private_key(ec.SECP256R1())),
+    ],
+)
+def test_key_set_rejects_key_of_wrong_type(tmp_path, algorithm, key):
+    _write_key(tmp_path, 'wrong', key)
+
+    with pytest.raises(ValueError, match='is not a'):
+        _key_set(tmp_path, algorithm=algorithm)
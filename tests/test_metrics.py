@@ -0,0 +1,60 @@
+from http import HTTPStatus
+
+from fast_zero.metrics import (
+    Counter,
+    Histogram,
+    http_requests,
+    render,
+)
+
+
+def test_counter_render_escapes_labels():
+    metric = Counter('test_total', 'Test counter', ('name',))
+    metric.inc(name='a"b')
+
+    lines = render({metric.name: metric}).splitlines()
+
+    assert 'test_total{name="a\\"b"} 1' in lines
+
+
+def test_histogram_render_is_cumulative():
+    metric = Histogram('test_seconds', 'Test histogram', buckets=(0.1, 1))
+    metric.observe(0.05)
+    metric.observe(0.5)
+    metric.observe(5)
+
+    lines = render({metric.name: metric}).splitlines()
+
+    assert 'test_seconds_bucket{le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{le="1"} 2' in lines
+    assert 'test_seconds_bucket{le="+Inf"} 3' in lines
+    assert 'test_seconds_count 3' in lines
+    assert metric.sum() == 5.55  # noqa: PLR2004
+
+
+def test_metrics_endpoint(client, user):
+    before = http_requests.value(
+        method='POST', route='/users/', status=HTTPStatus.CREATED
+    )
+    client.post(
+        '/users/',
+        json={
+            'username': 'alice',
+            'email': 'alice@example.com',
+            'password': 'secret',
+        },
+    )
+
+    response = client.get('/metrics')
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'].startswith('text/plain')
+    assert (
+        http_requests.value(
+            method='POST', route='/users/', status=HTTPStatus.CREATED
+        )
+        == before + 1
+    )
+    assert 'fast_zero_http_request_duration_seconds_bucket' in response.text
+    assert 'fast_zero_db_queries_total{statement="INSERT"}' in response.text
+    assert 'fast_zero_password_hash_seconds_count' in response.text
@@ -0,0 +1,88 @@
+from http import HTTPStatus
+
+import pytest
+from fastapi import HTTPException
+
+from fast_zero.ratelimit import (
+    InMemoryRateLimitBackend,
+    LoginLimiter,
+    RateLimitBackend,
+)
+
+
+def _limiter(**overrides):
+    options = {
+        'ip_rate': 1.0,
+        'ip_burst': 10,
+        'account_rate': 1.0,
+        'account_burst': 10,
+        'max_concurrent_verifications': 1,
+    }
+    options.update(overrides)
+    return LoginLimiter(InMemoryRateLimitBackend(), **options)
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_allows_burst_then_waits():
+    backend = InMemoryRateLimitBackend()
+
+    assert await backend.take('k', 1.0, 2) == 0
+    assert await backend.take('k', 1.0, 2) == 0
+    assert await backend.take('k', 1.0, 2) > 0
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_prunes_old_keys():
+    backend = InMemoryRateLimitBackend(max_keys=1)
+
+    await backend.take('a', 1.0, 1)
+    await backend.take('b', 1.0, 1)
+
+    assert await backend.take('a', 1.0, 1) == 0
+
+
+@pytest.mark.asyncio
+async def test_login_limiter_per_ip():
+    limiter = _limiter(ip_burst=1)
+    await limiter.admit('1.2.3.4', 'a@example.com')
+
+    with pytest.raises(HTTPException) as exc:
+        await limiter.admit('1.2.3.4', 'b@example.com')
+
+    assert exc.value.status_code == HTTPStatus.TOO_MANY_REQUESTS
+    assert exc.value.headers['Retry-After'] == '1'
+    await limiter.admit('5.6.7.8', 'b@example.com')
+
+
+@pytest.mark.asyncio
+async def test_login_limiter_per_account_ignores_case():
+    limiter = _limiter(account_burst=1)
+    await limiter.admit('1.2.3.4', 'a@example.com')
+
+    with pytest.raises(HTTPException) as exc:
+        await limiter.admit('5.6.7.8', 'A@example.com')
+
+    assert exc.value.status_code == HTTPStatus.TOO_MANY_REQUESTS
+
+
+@pytest.mark.asyncio
+async def test_login_limiter_caps_concurrent_verifications():
+    limiter = _limiter()
+
+    async with limiter.verification():
+        with pytest.raises(HTTPException) as exc:
+            async with limiter.verification():
+                pass
+
+    assert exc.value.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    async with limiter.verification():
+        pass
+
+
+def test_rate_limit_backend_requires_every_operation():
+    class TakeOnlyBackend(RateLimitBackend):
+        async def take(self, key, rate, burst):  # noqa: PLR6301
+            return 0.0
+
+    with pytest.raises(TypeError):
+        TakeOnlyBackend()
@@ -0,0 +1,17 @@
+from fast_zero import server
+
+
+def test_main_runs_uvicorn_workers(monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        server.uvicorn, 'run', lambda app, **kw: calls.append((app, kw))
+    )
+
+    server.main(['--workers', '3', '--backlog', '512', '--keep-alive', '10'])
+
+    [(app, options)] = calls
+    assert app == 'fast_zero.app:app'
+    assert options['workers'] == 3  # noqa: PLR2004
+    assert options['backlog'] == 512  # noqa: PLR2004
+    assert options['timeout_keep_alive'] == 10  # noqa: PLR2004
+    assert 'fast_zero' in options['log_config']['loggers']
@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fast_zero.security import lookup_user
+from fast_zero.singleflight import (
+    SingleFlight,
+    singleflight_calls,
+    singleflight_coalesced,
+)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight('test-share')
+    release = asyncio.Event()
+    executions = 0
+
+    async def fetch():
+        nonlocal executions
+        executions += 1
+        await release.wait()
+        return 'value'
+
+    calls = [asyncio.create_task(flight.do('key', fetch)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*calls) == ['value'] * 5
+    assert executions == 1
+    assert singleflight_calls.value(group='test-share') == 1
+    assert singleflight_coalesced.value(group='test-share') == 4  # noqa: PLR2004
+    assert len(flight) == 0
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_caller_and_release_the_key():
+    flight = SingleFlight('test-error')
+
+    async def fail():
+        await asyncio.sleep(0)
+        raise RuntimeError('boom')
+
+    results = await asyncio.gather(
+        flight.do('key', fail), flight.do('key', fail), return_exceptions=True
+    )
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert len(flight) == 0
+
+    async def succeed():
+        return 'value'
+
+    assert await flight.do('key', succeed) == 'value'
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_the_lookup():
+    flight = SingleFlight('test-cancel')
+    release = asyncio.Event()
+
+    async def fetch():
+        await release.wait()
+        return 'value'
+
+    first = asyncio.create_task(flight.do('key', fetch))
+    second = asyncio.create_task(flight.do('key', fetch))
+    await asyncio.sleep(0)
+    first.cancel()
+    release.set()
+
+    assert await second == 'value'
+
+
+@pytest.mark.asyncio
+async def test_lookup_user_coalesces_queries(session, user, count_queries):
+    sessions = [AsyncSession(session.bind) for _ in range(3)]
+
+    with count_queries() as statements:
+        users = await asyncio.gather(
+            *(lookup_user(s, user.email) for s in sessions)
+        )
+
+    assert statements == ['SELECT']
+    assert {u.id for u in users} == {user.id}
+    # cada sessão recebe o seu próprio objeto
+    assert len({id(u) for u in users}) == len(sessions)
+    for s in sessions:
+        await s.close()
+
+
+@pytest.mark.asyncio
+async def test_lookup_user_survives_first_caller_cancelled(session, user):
+    first_session = AsyncSession(session.bind)
+    second_session = AsyncSession(session.bind)
+    coalesced = singleflight_coalesced.value(group='user_lookup')
+
+    first = asyncio.create_task(lookup_user(first_session, user.email))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(lookup_user(second_session, user.email))
+    await asyncio.sleep(0)
+    first.cancel()
+    await first_session.close()
+
+    found = await second
+
+    assert found.id == user.id
+    assert singleflight_coalesced.value(group='user_lookup') == coalesced + 1
+    await second_session.close()
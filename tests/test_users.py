@@ -1,7 +1,27 @@
+import asyncio
 from http import HTTPStatus
 
-from fast_zero.schemas import UserPublic
-from fast_zero.security import create_access_token
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fast_zero.cache import cache_hits
+from fast_zero.database import db_queries
+from fast_zero.hashing import hash_seconds
+from fast_zero.models import User
+from fast_zero.routers import users as users_router
+from fast_zero.routers.users import lookup_users
+from fast_zero.schemas import (
+    MAX_LOOKUP_USERS,
+    MAX_PAGE_LIMIT,
+    UserLookup,
+    UserPublic,
+)
+from fast_zero.security import (
+    create_access_token,
+    principal_cache,
+    settings,
+    token_version_cache,
+)
 
 
 def test_create_user(client):
@@ -158,3 +178,854 @@ def test_existent_user_email(client, user):
     )
     assert response.status_code == HTTPStatus.CONFLICT
     assert response.json() == {'detail': 'Username or Email already exists'}
+
+
+def test_get_current_user_is_cached(client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    hits = cache_hits.value(cache='principal')
+
+    client.get(f'/users/{user.id}/email', headers=headers)
+    response = client.get(f'/users/{user.id}/email', headers=headers)
+
+    assert response.status_code == HTTPStatus.OK
+    assert cache_hits.value(cache='principal') == hits + 1
+
+
+def test_update_user_invalidates_cached_principal(client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.get(f'/users/{user.id}/email', headers=headers)
+
+    client.put(
+        f'/users/{user.id}',
+        headers=headers,
+        json={
+            'username': 'tester',
+            'email': 'changed@example.com',
+            'password': 'mynewpassword',
+        },
+    )
+    response = client.get(f'/users/{user.id}/email', headers=headers)
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def _create_users(client, count):
+    for i in range(count):
+        client.post(
+            '/users/',
+            json={
+                'username': f'user{i}',
+                'email': f'user{i}@example.com',
+                'password': 'secret',
+            },
+        )
+
+
+@pytest.mark.parametrize('order_by', ['id', 'created_at'])
+def test_read_users_with_cursor(client, order_by):
+    _create_users(client, 5)
+
+    first = client.get(
+        '/users/', params={'limit': 2, 'order_by': order_by}
+    ).json()
+    second = client.get(
+        '/users/',
+        params={
+            'cursor': first['next_cursor'],
+            'limit': 2,
+            'order_by': order_by,
+        },
+    ).json()
+    third = client.get(
+        '/users/',
+        params={
+            'cursor': second['next_cursor'],
+            'limit': 2,
+            'order_by': order_by,
+        },
+    ).json()
+
+    ids = [u['id'] for page in (first, second, third) for u in page['users']]
+    assert ids == [1, 2, 3, 4, 5]
+    assert 'next_cursor' not in third
+
+
+def test_read_users_offset_page_follows_order_by(client, count_queries):
+    _create_users(client, 3)
+
+    with count_queries() as statements:
+        first = client.get(
+            '/users/',
+            params={'offset': 1, 'limit': 1, 'order_by': 'created_at'},
+        ).json()
+    second = client.get(
+        '/users/',
+        params={
+            'cursor': first['next_cursor'],
+            'limit': 1,
+            'order_by': 'created_at',
+        },
+    ).json()
+
+    assert 'ORDER BY users.created_at, users.id' in statements.sql[-1]
+    assert [u['id'] for u in first['users'] + second['users']] == [2, 3]
+
+
+def test_read_users_with_invalid_cursor(client):
+    response = client.get('/users/', params={'cursor': 'not-a-cursor'})
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {'detail': 'Invalid cursor'}
+
+
+def test_read_users_cursor_must_match_order(client):
+    _create_users(client, 2)
+    first = client.get('/users/', params={'limit': 1}).json()
+
+    response = client.get(
+        '/users/',
+        params={'cursor': first['next_cursor'], 'order_by': 'created_at'},
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+def test_read_users_limit_is_capped(client):
+    response = client.get('/users/', params={'limit': MAX_PAGE_LIMIT + 1})
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+def test_create_users_bulk(client, user, token):
+    # a rota faz rollback antes dos hashes, e nos testes a sessão da
+    # requisição é a mesma da fixture: `user` expira junto
+    username = user.username
+    response = client.post(
+        '/users/bulk',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'users': [
+                {
+                    'username': 'alice',
+                    'email': 'alice@example.com',
+                    'password': 'secret',
+                },
+                {
+                    'username': username,
+                    'email': 'other@example.com',
+                    'password': 'secret',
+                },
+                {
+                    'username': 'bob',
+                    'email': 'alice@example.com',
+                    'password': 'secret',
+                },
+                {
+                    'username': 'carol',
+                    'email': 'carol@example.com',
+                    'password': 'secret',
+                },
+            ]
+        },
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert [
+        (r['username'], r['status'], r['id'])
+        for r in response.json()['results']
+    ] == [
+        ('alice', 'created', 2),
+        (username, 'conflict', None),
+        ('bob', 'conflict', None),
+        ('carol', 'created', 3),
+    ]
+
+    login = client.post(
+        '/auth/token',
+        data={'username': 'carol@example.com', 'password': 'secret'},
+    )
+    assert login.status_code == HTTPStatus.OK
+
+
+def test_create_users_bulk_rejects_empty_batch(client, token):
+    response = client.post(
+        '/users/bulk',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'users': []},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+def test_create_users_bulk_hashes_outside_a_transaction(
+    client, session, token, monkeypatch
+):
+    in_transaction = []
+
+    async def fake_hash(password):
+        in_transaction.append(session.in_transaction())
+        return 'hash'
+
+    monkeypatch.setattr(users_router, 'get_password_hash_async', fake_hash)
+
+    response = client.post(
+        '/users/bulk',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'users': [
+                {
+                    'username': 'alice',
+                    'email': 'alice@example.com',
+                    'password': 'secret',
+                }
+            ]
+        },
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert in_transaction == [False]
+
+
+def test_create_users_bulk_marks_rows_lost_to_a_race(
+    client, session, token, monkeypatch
+):
+    raced = False
+
+    async def hash_while_someone_registers(password):
+        # outra requisição cria `alice` entre a checagem e o INSERT do lote
+        nonlocal raced
+        if not raced:
+            raced = True
+            async with AsyncSession(session.bind) as other:
+                other.add(
+                    User(
+                        username='alice',
+                        email='alice@other.com',
+                        password='hash',
+                    )
+                )
+                await other.commit()
+        return 'hash'
+
+    monkeypatch.setattr(
+        users_router, 'get_password_hash_async', hash_while_someone_registers
+    )
+
+    response = client.post(
+        '/users/bulk',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'users': [
+                {
+                    'username': 'alice',
+                    'email': 'alice@example.com',
+                    'password': 'secret',
+                },
+                {
+                    'username': 'carol',
+                    'email': 'carol@example.com',
+                    'password': 'secret',
+                },
+            ]
+        },
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert [
+        (r['username'], r['status']) for r in response.json()['results']
+    ] == [('alice', 'conflict'), ('carol', 'created')]
+    assert response.json()['results'][1]['id'] is not None
+
+
+def test_create_users_bulk_requires_token(client):
+    response = client.post(
+        '/users/bulk',
+        json={
+            'users': [
+                {
+                    'username': 'alice',
+                    'email': 'alice@example.com',
+                    'password': 'secret',
+                }
+            ]
+        },
+    )
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_create_users_bulk_is_rate_limited_per_account(client, token):
+    headers = {'Authorization': f'Bearer {token}'}
+
+    responses = [
+        client.post(
+            '/users/bulk',
+            headers=headers,
+            json={
+                'users': [
+                    {
+                        'username': f'user{i}',
+                        'email': f'user{i}@example.com',
+                        'password': 'secret',
+                    }
+                ]
+            },
+        )
+        for i in range(settings.BULK_USERS_BURST + 1)
+    ]
+
+    assert [r.status_code for r in responses[:-1]] == [HTTPStatus.OK] * (
+        settings.BULK_USERS_BURST
+    )
+    assert responses[-1].status_code == HTTPStatus.TOO_MANY_REQUESTS
+    assert 'retry-after' in responses[-1].headers
+
+
+def test_read_users_not_modified(client, user):
+    first = client.get('/users/')
+    etag = first.headers['etag']
+
+    response = client.get('/users/', headers={'If-None-Match': etag})
+
+    assert etag.startswith('W/')
+    assert first.headers['cache-control'] == 'no-cache'
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert not response.content
+
+
+def test_read_users_etag_changes_after_write(client, user, token):
+    etag = client.get('/users/').headers['etag']
+    client.put(
+        f'/users/{user.id}',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'username': 'tester',
+            'email': user.email,
+            'password': 'mynewpassword',
+        },
+    )
+
+    response = client.get('/users/', headers={'If-None-Match': etag})
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['etag'] != etag
+    assert response.json()['users'][0]['username'] == 'tester'
+
+
+def test_read_users_etag_depends_on_page(client, user):
+    etag = client.get('/users/').headers['etag']
+
+    response = client.get(
+        '/users/', params={'limit': 1}, headers={'If-None-Match': etag}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_read_user_email_not_modified(client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    first = client.get(f'/users/{user.id}/email', headers=headers)
+
+    response = client.get(
+        f'/users/{user.id}/email',
+        headers={**headers, 'If-None-Match': first.headers['etag']},
+    )
+
+    assert first.headers['cache-control'] == 'private, no-cache'
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+
+def test_read_users_fast_matches_default(client):
+    _create_users(client, 3)
+
+    default = client.get('/users/', params={'limit': 2})
+    fast = client.get('/users/', params={'limit': 2, 'fast': True})
+
+    assert fast.status_code == HTTPStatus.OK
+    assert fast.json() == default.json()
+    assert fast.headers['etag'] == default.headers['etag']
+
+
+def test_read_users_fast_with_cursor(client):
+    _create_users(client, 3)
+
+    first = client.get('/users/', params={'limit': 2, 'fast': True}).json()
+    second = client.get(
+        '/users/',
+        params={'cursor': first['next_cursor'], 'limit': 2, 'fast': True},
+    ).json()
+
+    assert [u['id'] for u in first['users']] == [1, 2]
+    assert second == {
+        'users': [{'id': 3, 'username': 'user2', 'email': 'user2@example.com'}]
+    }
+
+
+def test_update_user_revokes_previous_tokens(client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.put(
+        f'/users/{user.id}',
+        headers=headers,
+        json={
+            'username': user.username,
+            'email': user.email,
+            'password': 'anotherpassword',
+        },
+    )
+
+    response = client.get(f'/users/{user.id}/email', headers=headers)
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_read_user_email_stateless_skips_user_lookup(
+    client, user, token, monkeypatch
+):
+    monkeypatch.setattr(settings, 'STATELESS_TOKENS', True)
+    headers = {'Authorization': f'Bearer {token}'}
+    client.get(f'/users/{user.id}/email', headers=headers)
+    before = db_queries.value(statement='SELECT')
+
+    response = client.get(f'/users/{user.id}/email', headers=headers)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {'email': user.email}
+    assert db_queries.value(statement='SELECT') == before
+
+
+def test_stateless_token_revoked_after_delete(
+    client, user, token, monkeypatch
+):
+    monkeypatch.setattr(settings, 'STATELESS_TOKENS', True)
+    headers = {'Authorization': f'Bearer {token}'}
+    client.delete(f'/users/{user.id}', headers=headers)
+
+    response = client.get(f'/users/{user.id}/email', headers=headers)
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_revoked_token_rejected_by_worker_with_stale_principal(
+    client, user, token
+):
+    user_id, email = user.id, user.email
+    headers = {'Authorization': f'Bearer {token}'}
+    client.get(f'/users/{user_id}/email', headers=headers)
+    stale = principal_cache.get(email)
+
+    client.put(
+        f'/users/{user_id}',
+        headers=headers,
+        json={
+            'username': 'Teste',
+            'email': email,
+            'password': 'anotherpassword',
+        },
+    )
+    # outro worker: não viu a invalidação e o TTL da versão já venceu
+    principal_cache.set(email, stale)
+    token_version_cache.clear()
+
+    response = client.get(f'/users/{user_id}/email', headers=headers)
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_search_users_by_prefix(client):
+    _create_users(client, 12)
+
+    response = client.get('/users/search', params={'q': 'USER1'})
+
+    assert response.status_code == HTTPStatus.OK
+    assert [u['username'] for u in response.json()['users']] == [
+        'user1',
+        'user10',
+        'user11',
+    ]
+
+
+def test_search_users_by_email_prefix_with_cursor(client):
+    _create_users(client, 3)
+
+    first = client.get('/users/search', params={'q': 'user', 'limit': 2})
+    second = client.get(
+        '/users/search',
+        params={
+            'q': 'user',
+            'limit': 2,
+            'cursor': first.json()['next_cursor'],
+        },
+    )
+
+    assert [u['id'] for u in first.json()['users']] == [1, 2]
+    assert second.json() == {
+        'users': [{'id': 3, 'username': 'user2', 'email': 'user2@example.com'}]
+    }
+
+
+def test_search_users_prefix_folds_only_ascii_on_sqlite(client):
+    client.post(
+        '/users/',
+        json={
+            'username': 'Élodie',
+            'email': 'elodie@example.com',
+            'password': 'secret',
+        },
+    )
+
+    def search(q):
+        response = client.get('/users/search', params={'q': q})
+        return [u['username'] for u in response.json()['users']]
+
+    assert search('ÉLO') == ['Élodie']
+    # É e é são caracteres diferentes para o lower() do SQLite
+    assert search('élo') == []
+
+
+def test_search_users_fulltext(client, user):
+    _create_users(client, 2)
+
+    response = client.get(
+        '/users/search', params={'q': 'er1@exa', 'mode': 'fulltext'}
+    )
+
+    assert response.json()['users'] == [
+        {'id': 3, 'username': 'user1', 'email': 'user1@example.com'}
+    ]
+
+
+def test_search_users_fulltext_follows_updates(client, user, token):
+    client.put(
+        f'/users/{user.id}',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'username': 'renamed',
+            'email': user.email,
+            'password': 'mynewpassword',
+        },
+    )
+
+    renamed = client.get(
+        '/users/search', params={'q': 'named', 'mode': 'fulltext'}
+    )
+    old = client.get(
+        '/users/search', params={'q': 'Teste', 'mode': 'fulltext'}
+    )
+
+    assert [u['username'] for u in renamed.json()['users']] == ['renamed']
+    assert old.json()['users'] == [
+        {'id': user.id, 'username': 'renamed', 'email': user.email}
+    ]
+
+
+def test_search_users_fulltext_quotes_operators(client, user):
+    response = client.get(
+        '/users/search', params={'q': 'a" OR "b', 'mode': 'fulltext'}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {'users': []}
+
+
+@pytest.mark.parametrize('q', ['a', 'ab'])
+def test_search_users_fulltext_rejects_short_queries(client, q):
+    response = client.get('/users/search', params={'q': q, 'mode': 'fulltext'})
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+def test_patch_user_updates_only_sent_fields(client, user, token):
+    hashes = hash_seconds.count(operation='hash')
+    selects = db_queries.value(statement='SELECT')
+
+    response = client.patch(
+        f'/users/{user.id}',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'username': 'renamed'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {
+        'id': user.id,
+        'username': 'renamed',
+        'email': user.email,
+    }
+    assert hash_seconds.count(operation='hash') == hashes
+    # só o SELECT da autenticação; o resultado vem do RETURNING
+    assert db_queries.value(statement='SELECT') == selects + 1
+
+
+def test_patch_user_keeps_tokens_without_credential_change(
+    client, user, token
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.patch(
+        f'/users/{user.id}', headers=headers, json={'username': 'renamed'}
+    )
+
+    response = client.get(f'/users/{user.id}/email', headers=headers)
+
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_patch_user_password_revokes_tokens(client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.patch(
+        f'/users/{user.id}', headers=headers, json={'password': 'newsecret'}
+    )
+
+    response = client.get(f'/users/{user.id}/email', headers=headers)
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+    response = client.post(
+        '/auth/token',
+        data={'username': user.email, 'password': 'newsecret'},
+    )
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_patch_user_conflict(client, user, token):
+    _create_users(client, 1)
+
+    response = client.patch(
+        f'/users/{user.id}',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'username': 'user0'},
+    )
+
+    assert response.status_code == HTTPStatus.CONFLICT
+    assert response.json() == {'detail': 'Username or Email already exists'}
+
+
+def test_patch_other_user_forbidden(client, user, token):
+    response = client.patch(
+        f'/users/{user.id + 1}',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'username': 'renamed'},
+    )
+
+    assert response.status_code == HTTPStatus.FORBIDDEN
+
+
+def test_create_user_is_a_single_insert(client, count_queries):
+    with count_queries() as statements:
+        response = client.post(
+            '/users/',
+            json={
+                'username': 'alice',
+                'email': 'alice@example.com',
+                'password': 'secret',
+            },
+        )
+
+    assert response.status_code == HTTPStatus.CREATED
+    assert statements == ['INSERT']
+
+
+def test_create_user_conflict_is_a_single_insert(client, user, count_queries):
+    with count_queries() as statements:
+        response = client.post(
+            '/users/',
+            json={
+                'username': user.username,
+                'email': 'other@example.com',
+                'password': 'secret',
+            },
+        )
+
+    assert response.status_code == HTTPStatus.CONFLICT
+    assert statements == ['INSERT']
+
+
+def test_delete_user_statements(client, user, token, count_queries):
+    with count_queries() as statements:
+        response = client.delete(
+            f'/users/{user.id}', headers={'Authorization': f'Bearer {token}'}
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    # o SELECT é da autenticação (cache vazio); a remoção é um DELETE direto
+    assert statements == ['SELECT', 'DELETE']
+
+
+def test_delete_user_already_removed(client, user, token, monkeypatch):
+    monkeypatch.setattr(settings, 'STATELESS_TOKENS', True)
+    headers = {'Authorization': f'Bearer {token}'}
+    # o token ainda é válido no cache de versões, mas a linha já não existe
+    client.get(f'/users/{user.id}/email', headers=headers)
+    client.delete(f'/users/{user.id}', headers=headers)
+    token_version_cache.set(user.id, 0)
+
+    response = client.delete(f'/users/{user.id}', headers=headers)
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert response.json() == {'detail': 'User not found'}
+
+
+@pytest.mark.parametrize('fast', [False, True])
+def test_read_users_sparse_fields(client, fast):
+    _create_users(client, 2)
+
+    response = client.get(
+        '/users/', params={'fields': 'email,id', 'limit': 1, 'fast': fast}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['users'] == [
+        {'email': 'user0@example.com', 'id': 1}
+    ]
+    assert response.json()['next_cursor']
+
+
+def test_read_users_fields_only_selects_requested_columns(
+    client, user, count_queries
+):
+    with count_queries() as statements:
+        response = client.get(
+            '/users/', params={'fields': 'username,created_at'}
+        )
+
+    assert set(response.json()['users'][0]) == {'username', 'created_at'}
+    page_query = statements.sql[-1]
+    assert 'users.created_at' in page_query
+    assert 'users.email' not in page_query
+
+
+def test_read_users_default_does_not_read_password(
+    client, user, count_queries
+):
+    with count_queries() as statements:
+        client.get('/users/')
+
+    assert not any('users.password' in sql for sql in statements.sql)
+
+
+def test_read_users_documents_every_sparse_field(client):
+    openapi = client.get('/openapi.json').json()
+    schemas = openapi['components']['schemas']
+    page = openapi['paths']['/users/']['get']
+
+    assert page['responses']['200']['content']['application/json'][
+        'schema'
+    ] == {'$ref': '#/components/schemas/UserFieldsList'}
+    assert set(schemas['UserFields']['properties']) == {
+        'id',
+        'username',
+        'email',
+        'created_at',
+        'updated_at',
+    }
+    assert 'required' not in schemas['UserFields']
+
+
+def test_read_users_rejects_unknown_fields(client):
+    response = client.get('/users/', params={'fields': 'id,password'})
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+def test_lookup_users_keeps_request_order_and_misses(client, count_queries):
+    _create_users(client, 3)
+
+    with count_queries() as statements:
+        response = client.post(
+            '/users/lookup',
+            json={
+                'ids': [3, 99, 1],
+                'emails': ['user1@example.com', 'nobody@example.com'],
+            },
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    assert statements == ['SELECT']
+    assert response.json() == {
+        'results': [
+            {
+                'id': 3,
+                'user': {
+                    'id': 3,
+                    'username': 'user2',
+                    'email': 'user2@example.com',
+                },
+            },
+            {'id': 99, 'user': None},
+            {
+                'id': 1,
+                'user': {
+                    'id': 1,
+                    'username': 'user0',
+                    'email': 'user0@example.com',
+                },
+            },
+            {
+                'email': 'user1@example.com',
+                'user': {
+                    'id': 2,
+                    'username': 'user1',
+                    'email': 'user1@example.com',
+                },
+            },
+            {'email': 'nobody@example.com', 'user': None},
+        ]
+    }
+
+
+def test_lookup_users_served_from_user_cache(
+    client, user, token, count_queries
+):
+    client.post('/users/lookup', json={'ids': [user.id]})
+
+    with count_queries() as statements:
+        response = client.post(
+            '/users/lookup', json={'ids': [user.id], 'emails': [user.email]}
+        )
+
+    assert statements == []
+    assert [r['user']['id'] for r in response.json()['results']] == [
+        user.id,
+        user.id,
+    ]
+
+
+def test_lookup_users_cache_invalidated_by_writes(client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.post('/users/lookup', json={'ids': [user.id]})
+
+    client.patch(
+        f'/users/{user.id}', headers=headers, json={'username': 'renamed'}
+    )
+    response = client.post('/users/lookup', json={'ids': [user.id]})
+    assert response.json()['results'][0]['user']['username'] == 'renamed'
+
+    client.delete(f'/users/{user.id}', headers=headers)
+    response = client.post('/users/lookup', json={'emails': [user.email]})
+    assert response.json()['results'][0]['user'] is None
+
+
+@pytest.mark.asyncio
+async def test_lookup_users_survives_first_caller_cancelled(session, user):
+    first_session = AsyncSession(session.bind)
+    second_session = AsyncSession(session.bind)
+    lookup = UserLookup(ids=[user.id])
+
+    first = asyncio.create_task(lookup_users(lookup, first_session))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(lookup_users(lookup, second_session))
+    await asyncio.sleep(0)
+    first.cancel()
+    await first_session.close()
+
+    response = await second
+
+    assert response['results'][0]['user']['id'] == user.id
+    await second_session.close()
+
+
+@pytest.mark.parametrize(
+    'payload',
+    [{}, {'ids': []}, {'ids': list(range(MAX_LOOKUP_USERS + 1))}],
+)
+def test_lookup_users_validates_size(client, payload):
+    response = client.post('/users/lookup', json=payload)
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY